@@ -1,7 +1,17 @@
-import tkinter as tk
-from ui import OpenRacePlot
+import multiprocessing
+import sys
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed by the worker processes in frozen Windows builds
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        # Headless reports: the GUI (and Tk) is never imported
+        from batch_report import main
+        sys.exit(main(sys.argv[2:]))
+
+    import tkinter as tk
+    from ui import OpenRacePlot
+
     root = tk.Tk()
     app = OpenRacePlot(root)
     root.mainloop()
@@ -0,0 +1,268 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from matplotlib.gridspec import GridSpec
+from matplotlib.ticker import MaxNLocator
+
+from channel_store import ChannelStore
+from data_files import detect_distance_channel, detect_time_channel, read_data_file
+from decimation import plot_decimated
+from session_cache import session_cache
+
+# Layout used when no layout file is given; every key can be overridden by the layout file
+DEFAULT_REPORT_LAYOUT = {
+    "x_axis": "distance",  # 'distance' or 'time'; falls back to the other one if it was not detected
+    "plot_areas": "auto",  # Channels per plot area, e.g. [["Speed"], ["Throttle", "Brake"]], or "auto"
+    "track_report": None,  # {"x": ..., "y": ..., "color": ...} for the track map colored by a channel
+    "histograms": [],  # Up to four damper speed channels, drawn 2x2 like the histogram window
+    "format": "pdf",  # 'pdf' (one multi-page file per log) or 'png' (one file per page)
+    "figsize": [16, 10],
+    "dpi": 100,
+}
+AUTO_PLOT_AREAS = 4  # "auto" plot areas show the first channels of the log, one per area
+TRACK_MAX_POINTS = 20_000  # Track maps are thinned to about this many points; more do not show at report size
+
+
+def load_report_layout(file_path=None):
+    """Read a report layout from a JSON file on top of DEFAULT_REPORT_LAYOUT."""
+    layout = dict(DEFAULT_REPORT_LAYOUT)
+    if file_path:
+        with open(file_path) as file:
+            layout.update(json.load(file))
+    if layout["format"] not in ("pdf", "png"):
+        raise ValueError(f"Unsupported report format: {layout['format']}")
+    return layout
+
+
+def load_dataset(file_path):
+    """Return the dataset of file_path from the session cache, parsing and caching it on a miss."""
+    df = session_cache.load(file_path)
+    if df is None:
+        df = read_data_file(file_path)
+        session_cache.store(file_path, df)
+    return df
+
+
+def new_page(layout):
+    """Create a report page; pages are plain Agg figures, no GUI backend is involved."""
+    figure = Figure(figsize=layout["figsize"], dpi=layout["dpi"])
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def channel_page(store, dataset_name, layout):
+    """Draw the plot areas of the layout stacked over a shared distance or time axis."""
+    distance_channel = detect_distance_channel(store.columns)
+    time_channel = detect_time_channel(store.columns)
+    if layout["x_axis"] == "time":
+        x_channel = time_channel or distance_channel
+    else:
+        x_channel = distance_channel or time_channel
+    if x_channel is None:
+        raise ValueError("No distance or time channel found")
+
+    figure = new_page(layout)
+    areas = layout["plot_areas"]
+    if areas == "auto":
+        areas = auto_plot_areas(store, (distance_channel, time_channel))
+        if not areas:
+            raise ValueError("No channel to plot found")
+    grid = GridSpec(len(areas), 1, figure=figure, hspace=0 if len(areas) > 1 else 0.3)
+    first_ax = None
+    for i, channels in enumerate(areas):
+        ax = figure.add_subplot(grid[i], sharex=first_ax)
+        first_ax = first_ax or ax
+        ax.grid(True, alpha=0.3)
+
+        for channel in channels:
+            if channel not in store:
+                print(f"{dataset_name}: channel '{channel}' not found, skipped")
+                continue
+            x_data = store.numeric(x_channel)
+            y_data = store.numeric(channel)
+            if len(x_data) != len(y_data):
+                print(f"{dataset_name}: mismatched X ({len(x_data)}) and Y ({len(y_data)}) samples for {channel}, skipped")
+                continue
+            # Same min/max decimation as the plot areas, so a long stint stays a small file
+            plot_decimated(ax, x_data, y_data, pyramid=store.pyramid(channel), label=channel, linewidth=0.8)
+
+        if ax.get_lines():
+            ax.legend(loc='upper right', fontsize='small')
+        if i < len(areas) - 1:
+            ax.tick_params(labelbottom=False)
+
+    first_ax.set_title(dataset_name)
+    figure.axes[-1].set_xlabel(x_channel)
+    return figure
+
+
+def auto_plot_areas(store, x_channels):
+    """Return one plot area for each of the first AUTO_PLOT_AREAS numeric channels that are not an X axis."""
+    areas = []
+    for channel in store.columns:
+        if len(areas) == AUTO_PLOT_AREAS:
+            break
+        if channel not in x_channels and store.coerce(channel)[1].any():
+            areas.append([channel])
+    return areas
+
+
+def track_page(store, dataset_name, layout):
+    """Draw the track map colored by a channel, like the Track Report window."""
+    track = layout["track_report"]
+    for channel in (track["x"], track["y"], track["color"]):
+        if channel not in store:
+            raise ValueError(f"Track report channel '{channel}' not found")
+
+    x_values, x_valid = store.coerce(track["x"])
+    y_values, y_valid = store.coerce(track["y"])
+    color_values, color_valid = store.coerce(track["color"])
+    valid = np.flatnonzero(x_valid & y_valid & color_valid)
+    valid = valid[::max(len(valid) // TRACK_MAX_POINTS, 1)]
+
+    figure = new_page(layout)
+    ax = figure.add_subplot()
+    # Edgeless, rasterized markers keep the page fast to render and light as a PDF
+    scatter = ax.scatter(x_values[valid], y_values[valid], c=color_values[valid], cmap='coolwarm', s=2,
+                         linewidths=0, rasterized=True)
+    ax.set_xlabel(track["x"])
+    ax.set_ylabel(track["y"])
+    ax.set_title(f"Track Report: {dataset_name}")
+    ax.set_aspect('equal', adjustable='datalim')
+    colorbar = figure.colorbar(scatter, ax=ax)
+    colorbar.set_label(track["color"])
+    return figure
+
+
+def histogram_page(store, dataset_name, layout):
+    """Draw up to four damper speed histograms in a 2x2 grid, like the histogram window."""
+    figure = new_page(layout)
+    axes = figure.subplots(2, 2)
+    for ax, channel in zip(axes.flat, layout["histograms"]):
+        if channel not in store:
+            ax.set_title(f"{channel} (not found)")
+            continue
+        ax.hist(store.numeric(channel), bins=30, edgecolor="black", alpha=0.7)
+        ax.set_title(channel)
+        ax.set_xlabel(channel)
+        ax.set_ylabel('Frequency')
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=10))
+    figure.suptitle(dataset_name)
+    figure.tight_layout()
+    return figure
+
+
+def render_report(file_path, layout, output_dir, output_name=None):
+    """Worker process entry point: render the report of one log and return the written files.
+
+    output_name is the file name of the report without extension (default: the log's name).
+    """
+    started = time.perf_counter()
+    dataset_name = os.path.basename(file_path)
+    store = ChannelStore(load_dataset(file_path))
+
+    pages = []
+    if layout["plot_areas"]:
+        pages.append(("channels", channel_page(store, dataset_name, layout)))
+    if layout["track_report"]:
+        pages.append(("track", track_page(store, dataset_name, layout)))
+    if layout["histograms"]:
+        pages.append(("histograms", histogram_page(store, dataset_name, layout)))
+    if not pages:
+        raise ValueError("The layout does not contain any page")
+
+    stem = os.path.join(output_dir, output_name or os.path.splitext(dataset_name)[0])
+    written = []
+    if layout["format"] == "pdf":
+        with PdfPages(f"{stem}.pdf") as pdf:
+            for _, figure in pages:
+                pdf.savefig(figure)
+        written.append(f"{stem}.pdf")
+    else:
+        for page_name, figure in pages:
+            figure.savefig(f"{stem}_{page_name}.png")
+            written.append(f"{stem}_{page_name}.png")
+
+    for _, figure in pages:
+        figure.clear()
+    return written, time.perf_counter() - started
+
+
+def expand_inputs(patterns):
+    """Expand glob patterns (Windows shells do not) and drop duplicates, keeping the order."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        files.extend(match for match in matches if match not in files)
+    return files
+
+
+def output_names(files):
+    """Return a unique report name per log: its file name, prefixed by its folder when another log has the same name.
+
+    Per-day stint folders often hold logs with identical names, whose reports would overwrite each other.
+    """
+    stems = [os.path.splitext(os.path.basename(file_path))[0] for file_path in files]
+    names = []
+    for file_path, stem in zip(files, stems):
+        name = stem
+        if stems.count(stem) > 1:
+            folder = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+            name = f"{folder}_{stem}" if folder else stem
+        # Still taken (same folder name, or a log already named like that): number it
+        unique, number = name, 2
+        while unique in names:
+            unique, number = f"{name}_{number}", number + 1
+        names.append(unique)
+    return names
+
+
+def run_batch(files, layout, output_dir, workers=None):
+    """Render the reports of files in a process pool; returns the list of (file, error) failures."""
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    failures = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_report, file_path, layout, output_dir, output_name): file_path
+                   for file_path, output_name in zip(files, output_names(files))}
+        for done, future in enumerate(as_completed(futures), start=1):
+            file_path = futures[future]
+            try:
+                written, seconds = future.result()
+                print(f"[{done}/{len(files)}] {file_path}: {', '.join(written)} ({seconds:.1f} s)")
+            except Exception as e:
+                failures.append((file_path, str(e)))
+                print(f"[{done}/{len(files)}] {file_path}: failed: {e}")
+
+    print(f"Rendered {len(files) - len(failures)} of {len(files)} reports in {time.perf_counter() - started:.1f} s")
+    return failures
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description="Render OpenRacePlot reports of many logs without the GUI.")
+    argument_parser.add_argument("inputs", nargs='+', help="Log files or glob patterns (CSV, TXT, XLSX, MoTeC .ld)")
+    argument_parser.add_argument("--layout", help="JSON report layout (plot_areas, x_axis, track_report, histograms, format)")
+    argument_parser.add_argument("-o", "--output-dir", default="reports")
+    argument_parser.add_argument("--format", choices=["pdf", "png"], help="Overrides the format of the layout")
+    argument_parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    args = argument_parser.parse_args(argv)
+
+    layout = load_report_layout(args.layout)
+    if args.format:
+        layout["format"] = args.format
+    files = expand_inputs(args.inputs)
+    failures = run_batch(files, layout, args.output_dir, args.workers)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from decimation import MinMaxPyramid
+
+
+class ChannelStore:
+    """Numeric view of one dataset: each channel is coerced to a NumPy array once and reused.
+
+    All plotting code reads channels through the store, so switching the X axis or
+    re-plotting never parses the same strings twice. Math channels live in the store too:
+    they are evaluated on first use like any other channel and cached until an input changes.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.coerced = {}  # Channel -> (contiguous float values, validity mask)
+        self.valid_values = {}  # Channel -> values with invalid samples dropped
+        self.pyramids = {}  # Channel -> MinMaxPyramid of its valid values
+        self.math_channels = {}  # Name -> MathChannel
+        self.dependents = {}  # Channel -> names of the math channels that read it directly
+
+    def __contains__(self, channel):
+        return channel in self.df.columns or channel in self.math_channels
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    def coerce(self, channel):
+        """Return (values, valid) for a channel, where invalid samples are NaN in values."""
+        if channel not in self.coerced and channel in self.math_channels:
+            # Inputs come through coerce() as well, so each one is evaluated at most once
+            math_channel = self.math_channels[channel]
+            arrays = [self.coerce(name)[0] for name in math_channel.inputs]
+            values = math_channel.evaluate(arrays, len(self.df))
+            self.coerced[channel] = (values, ~np.isnan(values))
+        elif channel not in self.coerced:
+            series = self.df[channel]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(object)
+
+            if series.dtype.kind in 'biuf':
+                # Already numeric, keep float32 columns compact and promote everything else
+                dtype = np.float32 if series.dtype == np.float32 else np.float64
+                values = np.ascontiguousarray(series.to_numpy(dtype=dtype))
+            else:
+                values = np.ascontiguousarray(pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan))
+
+            self.coerced[channel] = (values, ~np.isnan(values))
+        return self.coerced[channel]
+
+    def numeric(self, channel):
+        """Return the valid samples of a channel (the NumPy equivalent of pd.to_numeric(...).dropna())."""
+        if channel not in self.valid_values:
+            values, valid = self.coerce(channel)
+            self.valid_values[channel] = values if valid.all() else values[valid]
+        return self.valid_values[channel]
+
+    def pyramid(self, channel):
+        """Return the min/max pyramid of a channel's valid samples, built on first use."""
+        if channel not in self.pyramids:
+            self.pyramids[channel] = MinMaxPyramid(self.numeric(channel))
+        return self.pyramids[channel]
+
+    def is_integer(self, channel):
+        """Return whether a channel holds whole numbers (gear, flags) that should not be interpolated."""
+        return channel not in self.math_channels and self.df[channel].dtype.kind in 'biu'
+
+    def upstream(self, channel):
+        """Return every channel a channel is computed from, directly or through other math channels."""
+        found = set()
+        pending = [channel]
+        while pending:
+            math_channel = self.math_channels.get(pending.pop())
+            for name in math_channel.inputs if math_channel else ():
+                if name not in found:
+                    found.add(name)
+                    pending.append(name)
+        return found
+
+    def check_math_channel(self, math_channel):
+        """Evaluate a math channel without adding it and return its values.
+
+        Raises ValueError if it would replace a logged channel, reads a missing channel, depends
+        on itself or cannot be evaluated (e.g. a cutoff above half the sample rate).
+        """
+        name = math_channel.name
+        if name in self.df.columns:
+            raise ValueError(f"'{name}' is a logged channel")
+        missing = [channel for channel in math_channel.inputs if channel not in self]
+        if missing:
+            raise ValueError(f"Missing channels: {', '.join(missing)}")
+        if name in math_channel.inputs or any(name in self.upstream(channel) for channel in math_channel.inputs):
+            raise ValueError(f"'{name}' depends on itself")
+        return math_channel.evaluate([self.coerce(channel)[0] for channel in math_channel.inputs], len(self.df))
+
+    def add_math_channel(self, math_channel, values=None):
+        """Add or redefine a math channel and return the channels whose values changed.
+
+        values are the result of check_math_channel when the caller already checked it;
+        otherwise the channel is checked here (raising ValueError) before the store changes.
+        """
+        if values is None:
+            values = self.check_math_channel(math_channel)
+        name = math_channel.name
+        changed = self.invalidate(name) if name in self.math_channels else {name}
+        self.unlink(name)
+        self.math_channels[name] = math_channel
+        for channel in math_channel.inputs:
+            self.dependents.setdefault(channel, set()).add(name)
+        self.coerced[name] = (values, ~np.isnan(values))  # Evaluated by the check, no need to do it again
+        return changed
+
+    def remove_math_channel(self, name):
+        """Remove a math channel; raises ValueError while other math channels read it."""
+        if self.dependents.get(name):
+            raise ValueError(f"'{name}' is used by {', '.join(sorted(self.dependents[name]))}")
+        self.invalidate(name)
+        self.unlink(name)
+        del self.math_channels[name]
+
+    def unlink(self, name):
+        """Drop the dependency edges from the inputs of a math channel to it."""
+        if name in self.math_channels:
+            for channel in self.math_channels[name].inputs:
+                self.dependents[channel].discard(name)
+
+    def invalidate(self, channel):
+        """Forget the cached values of a channel and of every math channel computed from it.
+
+        Returns the set of invalidated channels; they are recomputed on their next use.
+        """
+        changed = set()
+        pending = [channel]
+        while pending:
+            name = pending.pop()
+            if name in changed:
+                continue
+            changed.add(name)
+            for cache in (self.coerced, self.valid_values, self.pyramids):
+                cache.pop(name, None)
+            pending.extend(self.dependents.get(name, ()))
+        return changed
@@ -0,0 +1,163 @@
+import os
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 100_000  # Rows parsed per chunk; only one chunk is held in pandas' default dtypes at a time
+GROWTH_FACTOR = 1.5  # Buffer growth when the row estimate was too low
+MAX_CATEGORIES = 1024  # Text columns with more distinct values are kept as plain object columns
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def estimate_rows(file_path, sample_bytes=64 * 1024):
+    """Estimate the number of lines of a text file from the line length of its first block."""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        sample = file.read(sample_bytes)
+
+    lines = sample.count(b'\n')
+    if lines == 0 or len(sample) >= size:
+        return max(lines, 1)
+    # A little headroom so the buffers normally never have to grow
+    return int(size / (len(sample) / lines) * 1.05) + 1
+
+
+def smallest_integer_type(low, high):
+    """Return the smallest integer dtype that holds [low, high]."""
+    for dtype in INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+class ColumnBuffer:
+    """Preallocated, typed storage of one column, filled chunk by chunk.
+
+    Numeric columns use the smallest integer type that holds every sample, or float32
+    (float64 when precise). Text columns such as flags are stored as category codes.
+    """
+
+    def __init__(self, name, capacity, precise=False):
+        self.name = name
+        self.capacity = capacity
+        self.precise = precise  # Keep float64, e.g. for time and distance channels
+        self.mode = None  # 'numeric', 'category' or 'object', decided by the first chunk
+        self.values = None  # Samples, or category codes in 'category' mode
+        self.length = 0
+        self.low = self.high = None  # Range of the integer samples seen so far
+        self.categories = {}  # Category value -> code
+
+    def append(self, series):
+        if self.mode is None:
+            self.mode = 'numeric' if series.dtype.kind in 'biuf' else 'category'
+
+        if self.mode == 'numeric':
+            if series.dtype.kind not in 'biuf':
+                # Text in a numeric column, the channel store would treat it as invalid anyway
+                series = pd.to_numeric(series, errors='coerce')
+            values = series.to_numpy()
+            self.write(values, self.required_type(values))
+
+        elif self.mode == 'category':
+            if series.dtype.kind in 'biuf':
+                series = series.astype(str).where(series.notna())  # Keep the categories all text
+            self.append_categories(series)
+
+        else:
+            self.write(series.to_numpy(dtype=object), np.dtype(object))
+
+    def required_type(self, values):
+        """Return the dtype that holds both the buffered samples and values."""
+        if values.dtype.kind == 'b':
+            values = values.astype(np.int8)
+
+        if self.precise:
+            dtype = np.dtype(np.float64)
+        elif values.dtype.kind in 'iu' or (len(values) and np.all(values == np.round(values))):
+            # Whole numbers without gaps (gear, flags, counters), track their range
+            if len(values):
+                low, high = values.min(), values.max()
+                self.low = low if self.low is None else min(self.low, low)
+                self.high = high if self.high is None else max(self.high, high)
+            dtype = smallest_integer_type(self.low or 0, self.high or 0)
+        else:
+            dtype = np.dtype(np.float32)
+
+        if self.values is None:
+            return dtype
+        return np.promote_types(self.values.dtype, dtype)
+
+    def append_categories(self, series):
+        codes, uniques = pd.factorize(series)  # Missing values get code -1
+        mapping = np.array([self.categories.setdefault(value, len(self.categories)) for value in uniques], dtype=np.int64)
+
+        if len(self.categories) > MAX_CATEGORIES:
+            # Too many distinct values for a category column, switch to plain objects
+            self.to_objects()
+            self.write(series.to_numpy(dtype=object), np.dtype(object))
+            return
+
+        global_codes = np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1)
+        self.write(global_codes, np.dtype(np.int16))
+
+    def to_objects(self):
+        """Turn the category codes written so far into an object column."""
+        categories = np.empty(len(self.categories) + 1, dtype=object)
+        categories[:-1] = list(self.categories)
+        categories[-1] = np.nan  # Code -1 picks the last entry
+        objects = np.empty(len(self.values) if self.values is not None else self.capacity, dtype=object)
+        if self.values is not None:
+            objects[:self.length] = categories[self.values[:self.length]]
+        self.values = objects
+        self.mode = 'object'
+
+    def write(self, values, dtype):
+        """Copy values behind the buffered samples, widening or growing the buffer if needed."""
+        needed = self.length + len(values)
+        if self.values is None:
+            self.values = np.empty(max(self.capacity, needed), dtype=dtype)
+        else:
+            if dtype != self.values.dtype:
+                print(f"Widening column '{self.name}' from {self.values.dtype} to {dtype}")
+                self.values = self.values.astype(dtype)
+            if needed > len(self.values):
+                grown = np.empty(max(needed, int(len(self.values) * GROWTH_FACTOR)), dtype=self.values.dtype)
+                grown[:self.length] = self.values[:self.length]
+                self.values = grown
+
+        self.values[self.length:needed] = values
+        self.length = needed
+
+    def to_series(self):
+        """Return the column as a Series; the buffer is shrunk to its length in place."""
+        if self.values is None:
+            return pd.Series([], dtype=np.float64, name=self.name)
+
+        self.values.resize(self.length, refcheck=False)
+        if self.mode == 'category':
+            values = pd.Categorical.from_codes(self.values, categories=list(self.categories))
+            return pd.Series(values, name=self.name, copy=False)
+        return pd.Series(self.values, name=self.name, copy=False)
+
+
+def read_csv_chunked(file_path, chunk_rows=CHUNK_ROWS, precise=None, **read_options):
+    """Read a delimited text file in chunks into compactly typed columns.
+
+    precise is an optional predicate on the column name for columns that must stay float64.
+    read_options are passed to pandas.read_csv (delimiter, header, usecols, ...).
+    """
+    capacity = estimate_rows(file_path)
+    buffers = {}
+
+    for chunk in pd.read_csv(file_path, chunksize=chunk_rows, **read_options):
+        for name in chunk.columns:
+            if name not in buffers:
+                buffers[name] = ColumnBuffer(name, capacity, precise(name) if precise else False)
+            buffers[name].append(chunk[name])
+        del chunk  # Release the chunk before the next one is parsed
+
+    if not buffers:
+        # Header only, keep the channel names
+        return pd.read_csv(file_path, nrows=0, **read_options)
+
+    return pd.DataFrame({name: buffer.to_series() for name, buffer in buffers.items()}, copy=False)
@@ -0,0 +1,71 @@
+from matplotlib.lines import Line2D
+
+
+class BlittedCrosshair:
+    """Vertical crosshair synchronized across all axes of one canvas, drawn with blitting."""
+
+    def __init__(self, canvas, axes, color='yellow', linestyle='--'):
+        self.canvas = canvas
+        self.color = color
+        self.linestyle = linestyle
+        self.axes = []
+        self.lines = []
+        self.backgrounds = {}  # Cached background per axes, captured after each full draw
+        self.x_position = None
+
+        # Connect exactly once per canvas; a full draw (zoom, pan, resize, theme) refreshes the cache
+        self.draw_cid = self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.motion_cid = self.canvas.mpl_connect("motion_notify_event", self.on_move)
+
+        self.set_axes(axes)
+
+    def set_axes(self, axes):
+        """Attach the crosshair to a new list of axes (after plot areas were added or removed)."""
+        self.axes = list(axes)
+        self.lines = [self._create_line(ax) for ax in self.axes]
+        self.backgrounds = {}
+
+    def _create_line(self, ax):
+        """Create a crosshair line that is drawn on the axes but never added to it.
+
+        Keeping the line out of ax.lines means ax.clear(), relim() and the legend never see it.
+        """
+        line = Line2D([0, 0], [0, 1], transform=ax.get_xaxis_transform(), color=self.color,
+                      linestyle=self.linestyle, animated=True)
+        line.set_figure(ax.figure)
+        line.set_clip_box(ax.bbox)
+        return line
+
+    def on_draw(self, event):
+        """Cache the freshly drawn background of every axes and put the crosshair back on top."""
+        self.backgrounds = {ax: self.canvas.copy_from_bbox(ax.bbox) for ax in self.axes}
+        if self.x_position is not None:
+            self._blit()
+
+    def on_move(self, event):
+        """Move the crosshair to the mouse X position (in data coordinates)."""
+        if not event.inaxes or event.xdata is None or event.inaxes not in self.axes:
+            return
+        self.x_position = event.xdata
+        self._blit()
+
+    def _blit(self):
+        """Restore the cached backgrounds and redraw only the crosshair lines."""
+        if not self.backgrounds:
+            return  # Nothing cached yet, the next draw_event will fill the cache
+
+        for ax, line in zip(self.axes, self.lines):
+            background = self.backgrounds.get(ax)
+            if background is None:
+                continue
+            self.canvas.restore_region(background)
+            line.set_xdata([self.x_position, self.x_position])
+            ax.draw_artist(line)
+            self.canvas.blit(ax.bbox)
+
+    def disconnect(self):
+        """Disconnect the canvas callbacks and drop the cached backgrounds."""
+        self.canvas.mpl_disconnect(self.draw_cid)
+        self.canvas.mpl_disconnect(self.motion_cid)
+        self.lines = []
+        self.backgrounds = {}
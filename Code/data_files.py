@@ -0,0 +1,62 @@
+import pandas as pd
+
+from chunked_reader import read_csv_chunked
+from ld_reader import LdFile, read_ld_file
+
+# pandas options for the tab separated logger exports
+TXT_READ_OPTIONS = dict(delimiter="\t", header=3, skiprows=[4], on_bad_lines='skip')  # Adjust as needed
+
+# Channels that keep float64 samples; everything else is stored as float32 or the smallest integer type
+PRECISE_CHANNEL_KEYWORDS = ["dist", "time", "lat", "lon"]
+
+
+def is_precise_channel(channel):
+    """Return True for channels whose samples need float64 resolution (time, distance, GPS)."""
+    return any(keyword in str(channel).lower() for keyword in PRECISE_CHANNEL_KEYWORDS)
+
+
+def read_data_file(file_path):
+    """Parse a whole data file into a DataFrame of compactly typed columns."""
+    if file_path.endswith('.csv'):
+        return read_csv_chunked(file_path, precise=is_precise_channel)
+    elif file_path.endswith('.xlsx'):
+        return pd.read_excel(file_path)
+    elif file_path.endswith('.TXT'):
+        return read_csv_chunked(file_path, precise=is_precise_channel, **TXT_READ_OPTIONS)
+    elif file_path.endswith('.ld'):
+        # MoTeC i2 log, decoded straight from the sample blocks onto a common time base
+        return read_ld_file(file_path, precise=is_precise_channel)
+    raise ValueError("Unsupported file type")
+
+
+def read_data_header(file_path):
+    """Read only the channel names of a data file."""
+    if file_path.endswith('.csv'):
+        return pd.read_csv(file_path, nrows=0).columns
+    elif file_path.endswith('.xlsx'):
+        return pd.read_excel(file_path, nrows=0).columns
+    elif file_path.endswith('.TXT'):
+        return pd.read_csv(file_path, nrows=0, **TXT_READ_OPTIONS).columns
+    elif file_path.endswith('.ld'):
+        return pd.Index(LdFile(file_path).columns())
+    raise ValueError("Unsupported file type")
+
+
+def detect_distance_channel(columns):
+    """Return the first distance-related channel name, or None."""
+    distance_related_keywords = ["dist", "xdist", "distance", "Distance"]
+    for channel in columns:
+        if any(keyword in channel.lower() for keyword in distance_related_keywords):
+            print(f"Detected distance channel: {channel}")
+            return channel
+    return None
+
+
+def detect_time_channel(columns):
+    """Return the first time-related channel name, or None."""
+    time_related_keywords = ["time", "timestamp", "Time", "Timestamp", "xTime"]
+    for channel in columns:
+        if any(keyword in channel.lower() for keyword in time_related_keywords):
+            print(f"Detected time channel: {channel}")
+            return channel
+    return None
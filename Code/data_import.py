@@ -2,99 +2,231 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import pandas as pd
 import uuid  # Import to generate unique IDs
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from channel_store import ChannelStore
+from chunked_reader import read_csv_chunked
+from data_files import (detect_distance_channel, detect_time_channel, is_precise_channel, read_data_file,
+                        read_data_header)
+from lap_table import format_lap_time, segment_laps
+from ld_reader import LdFile, read_ld_file
+from session_cache import session_cache
 
 
 colors = ["Red", "Blue", "Black", "Green"]
 
-def import_data(self):
-    """Import data from a file and detect distance- and time-related channels."""
+IMPORT_POLL_MS = 100  # How often the Tk thread checks for finished import workers
+
+
+class LazyFrame:
+    """Stand-in for a DataFrame that knows its columns up front and reads each channel on first use.
+
+    MoTeC .ld channels are read one at a time; other files are parsed once into the session cache.
+    """
+
+    def __init__(self, file_path, columns):
+        self.file_path = file_path
+        self.columns = pd.Index(columns)
+        self.loaded = {}  # Channel name -> Series, only for channels that were accessed
+        self.cached_df = None  # Memory-mapped columns once a CSV, TXT or Excel file was parsed into the session cache
+
+    def __getitem__(self, channel):
+        if channel not in self.columns:
+            raise KeyError(channel)
+        if channel not in self.loaded:
+            print(f"Loading channel '{channel}' from {self.file_path}")
+            self.loaded[channel] = self.read_channel(channel)
+        return self.loaded[channel]
+
+    def __len__(self):
+        if self.loaded:
+            return len(next(iter(self.loaded.values())))
+        if self.file_path.endswith('.ld'):
+            return len(LdFile(self.file_path).time_base)  # Known from the channel records, no samples are read
+        return len(self.parsed())
+
+    def read_channel(self, channel):
+        """Read a single channel from the source file."""
+        if self.file_path.endswith('.ld'):
+            return read_ld_file(self.file_path, channels=[channel], precise=is_precise_channel)[channel]
+        return self.parsed()[channel]
+
+    def parsed(self):
+        """Return the memory-mapped columns of the whole file, parsing it into the session cache once.
+
+        Text and Excel files cannot be read column by column without parsing every row, so the
+        first channel miss parses the file once and every later channel is served from the cache.
+        """
+        if self.cached_df is None:
+            df = read_data_file(self.file_path)
+            session_cache.store(self.file_path, df)
+            cached_df = session_cache.load(self.file_path)
+            self.cached_df = cached_df if cached_df is not None else df  # Keep the parsed columns if the cache is not writable
+        return self.cached_df
+
+
+def parse_into_cache(file_path):
+    """Worker process entry point: hash a data file and parse it into the session cache unless it is there.
+
+    Returns (content hash, None) once the columns are in the cache (the Tk thread memory-maps
+    them from there instead of receiving a pickled copy), or (content hash, parsed DataFrame)
+    if the cache could not be written.
+    """
+    key = session_cache.key_for(file_path)  # Hashing a large file takes a while, so it happens here and not on the Tk thread
+    if session_cache.contains(file_path, key):
+        return key, None
+    df = read_data_file(file_path)
+    session_cache.store(file_path, df, key)
+    if session_cache.contains(file_path, key):
+        return key, None
+    return key, df
+
+
+def import_data(self, lazy=False):
+    """Import one or more data files and detect their distance- and time-related channels.
+
+    Files whose content hash is not in the cache index yet are hashed, and parsed unless the
+    session cache has them, concurrently in a process pool; each finished dataset is registered
+    on the Tk thread, so the window stays responsive meanwhile. With lazy=True only the headers
+    are read; each channel is loaded the first time it is used.
+    """
     try:
-        # Ask the user for the file to import
-        file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Excel Files", "*.xlsx"), ("Text Files", "*.txt")])
-        if not file_path:
+        # Ask the user for the files to import
+        file_paths = filedialog.askopenfilenames(filetypes=[("CSV Files", "*.csv"), ("Excel Files", "*.xlsx"), ("Text Files", "*.txt"), ("MoTeC Logs", "*.ld")])
+        if not file_paths:
             return  # Exit if no file is selected
 
-        # Detect file type and read accordingly
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx'):
-            df = pd.read_excel(file_path)
-        elif file_path.endswith('.TXT'):
-            df = pd.read_csv(file_path, delimiter="\t", header=3, skiprows=[4], on_bad_lines='skip')  # Adjust as needed
-        else:
-            raise ValueError("Unsupported file type")
-
-        # Add the dataframe to the list of imported data
-        self.dataframes.append(df)
-
-        # Extract dataset name and assign it to the dataset list
-        dataset_name = file_path.split('/')[-1]  # Use the file name as the dataset name
-        self.dataset_names.append(dataset_name)
-
-        # Extract channel names (columns) and modify them to include dataset index using the '##' delimiter
-        dataset_index = len(self.dataframes) - 1  # The current dataset's index
-
-        modified_channels = [f"{channel}##{dataset_index}" for channel in df.columns]  # Append dataset index with '##'
-        self.channel_names.append(modified_channels)  # Store modified channel names
-
-        # Apply the current theme
-        if self.current_theme == 'black':
-            self.set_black_theme()
-        else:
-            self.set_white_theme()
-
-        # Map each channel (with '##' index) to its dataset
-        for channel in modified_channels:
-            self.channel_to_dataset_map[channel] = dataset_name
-
-        # Detect distance-related channels and store them
-        distance_related_keywords = ["dist", "xdist", "distance", "Distance"]
-        detected_distance_channel = None
-        for channel in df.columns:
-            if any(keyword in channel.lower() for keyword in distance_related_keywords):
-                detected_distance_channel = channel
-                print(f"Detected distance channel: {detected_distance_channel}")
-                break
-
-        # Detect time-related channels and store them
-        time_related_keywords = ["time", "timestamp", "Time", "Timestamp", "xTime"]
-        detected_time_channel = None
-        for channel in df.columns:
-            if any(keyword in channel.lower() for keyword in time_related_keywords):
-                detected_time_channel = channel
-                print(f"Detected time channel: {detected_time_channel}")
-                break
-
-        # Store the detected distance and time channels for auto-selection
-        self.auto_selected_distance_channel[dataset_name] = detected_distance_channel
-        self.auto_selected_time_channel[dataset_name] = detected_time_channel
-
-        # Assign a random color for each dataset for plotting purposes
-        dataset_color = self.random_color()
-        self.dataset_colors.append(dataset_color)
-
-        # Update the file explorer to show the dataset and its channels
-        self.update_file_explorer()
-
-        # Automatically activate distance mode by default if a distance channel is found
-        if detected_distance_channel:
-            print(f"Activating distance mode for {dataset_name}")
-            self.activate_distance_mode()
-        elif detected_time_channel:
-            print(f"Activating time mode for {dataset_name}")
-            self.activate_time_mode()  # Activate time mode if no distance channel is found but time is
-
-        print(f"Data imported successfully from {dataset_name}. Channels: {modified_channels}")
+        pending = []  # Files that still have to be hashed or parsed
+        last_dataset = None
+        for file_path in file_paths:
+            # Reuse the memory-mapped columns of an earlier import of the same file content; only files
+            # the cache index knows are looked up here, new files would have to be hashed first
+            key = session_cache.known_key(file_path)
+            df = session_cache.load(file_path, key) if key else None
+
+            if df is None and lazy:
+                # Read the header only so the file explorer fills immediately
+                df = LazyFrame(file_path, read_data_header(file_path))
+
+            if df is None:
+                pending.append(file_path)
+            else:
+                last_dataset = register_dataset(self, df, file_path)
+
+        if last_dataset:
+            refresh_after_import(self, last_dataset)
+        if not pending:
+            return
+
+        # Hash and parse the remaining files in worker processes, one file per task
+        executor = ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1))
+        futures = {executor.submit(parse_into_cache, file_path): file_path for file_path in pending}
+        executor.shutdown(wait=False)  # Workers exit once the submitted files are parsed
+        failures = []
+        self.import_progress.config(text=f"Importing 0/{len(pending)} files...")
+
+        def poll_imports():
+            """Register the datasets whose worker finished, then check again shortly."""
+            finished = [future for future in futures if future.done()]
+            dataset_name = None
+            for future in finished:
+                file_path = futures.pop(future)
+                try:
+                    key, df = future.result()
+                    if df is None:
+                        df = session_cache.load(file_path, key)
+                    dataset_name = register_dataset(self, df, file_path)
+                except Exception as e:
+                    failures.append(f"{file_path.split('/')[-1]}: {e}")
+                    print(f"Error during import of {file_path}: {str(e)}")
+
+            if dataset_name:
+                refresh_after_import(self, dataset_name)
+
+            done = len(pending) - len(futures)
+            if futures:
+                self.import_progress.config(text=f"Importing {done}/{len(pending)} files...")
+                self.root.after(IMPORT_POLL_MS, poll_imports)
+                return
+
+            self.import_progress.config(text="")
+            if failures:
+                messagebox.showerror("Error", "An error occurred while importing data:\n" + "\n".join(failures))
+
+        self.root.after(IMPORT_POLL_MS, poll_imports)
 
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred while importing data: {str(e)}")
         print(f"Error during import: {str(e)}")
 
 
+def register_dataset(self, df, file_path):
+    """Add a parsed dataset to the application and return its dataset name (no redraw)."""
+    # Add the dataframe to the list of imported data, with the store that coerces its channels once
+    self.dataframes.append(df)
+    self.channel_stores.append(ChannelStore(df))
+
+    # Extract dataset name and assign it to the dataset list
+    dataset_name = file_path.split('/')[-1]  # Use the file name as the dataset name
+    self.dataset_names.append(dataset_name)
+
+    # Extract channel names (columns) and modify them to include dataset index using the '##' delimiter
+    dataset_index = len(self.dataframes) - 1  # The current dataset's index
+
+    modified_channels = [f"{channel}##{dataset_index}" for channel in df.columns]  # Append dataset index with '##'
+    self.channel_names.append(modified_channels)  # Store modified channel names
+
+    # Map each channel (with '##' index) to its dataset
+    for channel in modified_channels:
+        self.channel_to_dataset_map[channel] = dataset_name
+
+    # Store the detected distance and time channels for auto-selection
+    self.auto_selected_distance_channel[dataset_name] = detect_distance_channel(df.columns)
+    self.auto_selected_time_channel[dataset_name] = detect_time_channel(df.columns)
+
+    # Split the dataset into laps; laps are index ranges into the store's arrays
+    lap_table = segment_laps(self.channel_stores[dataset_index], self.auto_selected_time_channel[dataset_name],
+                             self.auto_selected_distance_channel[dataset_name], self.start_finish_line)
+    self.lap_tables.append(lap_table)
+    print(f"{dataset_name}: {len(lap_table)} laps by {lap_table.method}: "
+          f"{', '.join(format_lap_time(lap_time) for lap_time in lap_table.lap_times)}")
+
+    # Assign a random color for each dataset for plotting purposes
+    dataset_color = self.random_color()
+    self.dataset_colors.append(dataset_color)
+
+    # Add the math channels defined so far, when the dataset has their inputs
+    self.attach_math_channels(dataset_index)
+
+    print(f"Data imported successfully from {dataset_name}. Channels: {modified_channels}")
+    return dataset_name
+
+
+def refresh_after_import(self, dataset_name):
+    """Update the theme, the file explorer and the X axis mode after datasets were registered."""
+    # Apply the current theme
+    if self.current_theme == 'black':
+        self.set_black_theme()
+    else:
+        self.set_white_theme()
+
+    # Update the file explorer to show the datasets and their channels
+    self.update_file_explorer()
+
+    # Automatically activate distance mode by default if a distance channel is found
+    if self.auto_selected_distance_channel.get(dataset_name):
+        print(f"Activating distance mode for {dataset_name}")
+        self.activate_distance_mode()
+    elif self.auto_selected_time_channel.get(dataset_name):
+        print(f"Activating time mode for {dataset_name}")
+        self.activate_time_mode()  # Activate time mode if no distance channel is found but time is
+
+
 def import_csv(app, file_path):
     try:
         print(f"Reading CSV file: {file_path}")
-        df = pd.read_csv(file_path, skiprows=[1])
+        df = read_csv_chunked(file_path, precise=is_precise_channel, skiprows=[1])
         append_data(app, df, file_path)
     except Exception as e:
         print(f"Exception occurred while importing {file_path}: {str(e)}")
@@ -112,7 +244,7 @@ def import_xlsx(app, file_path):
 def import_txt(app, file_path):
     try:
         print(f"Reading TXT file: {file_path}")
-        df = pd.read_csv(file_path, sep='\t', header=3, on_bad_lines='skip')
+        df = read_csv_chunked(file_path, precise=is_precise_channel, sep='\t', header=3, on_bad_lines='skip')
         print(f"Data imported successfully with shape: {df.shape}")
         print(df.head())  # Print the first few rows of the dataframe
         append_data(app, df, file_path)
@@ -122,6 +254,8 @@ def import_txt(app, file_path):
 
 def append_data(app, df, file_path):
     app.dataframes.append(df)
+    app.channel_stores.append(ChannelStore(df))
+    app.lap_tables.append(segment_laps(app.channel_stores[-1]))  # Keeps the lap tables parallel to the stores
     dataset_name = file_path.split("/")[-1]
     color_index = len(app.dataset_names) % len(colors)
     color = colors[color_index]
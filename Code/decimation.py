@@ -0,0 +1,160 @@
+import weakref
+import numpy as np
+
+# Full-resolution data behind every decimated Line2D (entries disappear with the line)
+_line_sources = weakref.WeakKeyDictionary()
+
+
+class MinMaxPyramid:
+    """Min/max summaries of one channel at power-of-two block sizes.
+
+    Level k holds the minimum and maximum of every block of 2**k samples, so any
+    index range can be summarized to about n_pixels blocks without touching the raw data.
+    """
+
+    def __init__(self, y):
+        self.y = np.asarray(y)
+        self.levels = {}  # k -> (block minimums, block maximums)
+
+        mins = maxs = self.y
+        k = 0
+        while len(mins) > 1:
+            if len(mins) % 2:
+                # Repeat the last block so every pair is complete
+                mins = np.append(mins, mins[-1])
+                maxs = np.append(maxs, maxs[-1])
+            mins = np.minimum(mins[0::2], mins[1::2])
+            maxs = np.maximum(maxs[0::2], maxs[1::2])
+            k += 1
+            self.levels[k] = (mins, maxs)
+
+    def envelope(self, x, start, stop, n_pixels):
+        """Return the min/max envelope of samples [start, stop) using the coarsest level that fills n_pixels."""
+        count = stop - start
+        if count <= 4 * n_pixels:
+            return x[start:stop], self.y[start:stop]  # Few enough samples to draw them all
+
+        k = min(int(np.log2(count / n_pixels)), max(self.levels))
+        first_block = start >> k
+        last_block = ((stop - 1) >> k) + 1
+        mins, maxs = self.levels[k]
+
+        # Place both points of a block at its center sample, but keep the exact X extent of the range
+        centers = np.minimum((np.arange(first_block, last_block) << k) + (1 << (k - 1)), len(x) - 1)
+        x_centers = x[centers]
+        x_centers[0] = x[start]
+        x_centers[-1] = x[stop - 1]
+
+        envelope_x = np.repeat(x_centers, 2)
+        envelope_y = np.column_stack([mins[first_block:last_block], maxs[first_block:last_block]]).ravel()
+        return envelope_x, envelope_y
+
+
+class LineSource:
+    """Full-resolution X/Y arrays of a plotted line, plus the pyramid of its Y channel."""
+
+    def __init__(self, x, y, pyramid=None):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.pyramid = pyramid
+        # Distance/time channels are normally increasing, which allows binary searches on X
+        self.monotonic = bool(len(self.x) < 2 or np.all(self.x[1:] >= self.x[:-1]))
+
+    def envelope(self, x_min, x_max, n_pixels):
+        """Return the decimated (x, y) data for the visible range [x_min, x_max]."""
+        if self.pyramid is None:
+            return minmax_envelope(self.x, self.y, x_min, x_max, n_pixels, self.monotonic)
+
+        if self.monotonic:
+            # Keep one sample outside each side so the line reaches the edges of the axes
+            start = max(np.searchsorted(self.x, x_min, side='left') - 1, 0)
+            stop = min(np.searchsorted(self.x, x_max, side='right') + 1, len(self.x))
+        else:
+            start, stop = 0, len(self.x)
+        return self.pyramid.envelope(self.x, start, stop, n_pixels)
+
+
+def pixel_width(ax):
+    """Return the width of the axes in screen pixels."""
+    return max(int(ax.bbox.width), 1)
+
+
+def minmax_envelope(x, y, x_min, x_max, n_pixels, monotonic=True):
+    """Reduce (x, y) to a per-pixel envelope of the samples visible in [x_min, x_max].
+
+    Every pixel column keeps its first, minimum, maximum and last sample, so peaks stay
+    visible and the result has at most 4 * n_pixels points regardless of the sample count.
+    """
+    if monotonic:
+        # Keep one sample outside each side so the line reaches the edges of the axes
+        start = max(np.searchsorted(x, x_min, side='left') - 1, 0)
+        stop = min(np.searchsorted(x, x_max, side='right') + 1, len(x))
+        x = x[start:stop]
+        y = y[start:stop]
+
+    if len(x) <= 4 * n_pixels:
+        return x, y  # Already fewer points than the screen can show
+
+    if monotonic:
+        # Pixel columns are equally wide in X, find where each one starts
+        edges = np.linspace(x[0], x[-1], n_pixels + 1)[:-1]
+        starts = np.unique(np.searchsorted(x, edges, side='left'))
+    else:
+        # Without an ordered X axis, fall back to equally sized blocks of samples
+        starts = np.unique(np.linspace(0, len(x), n_pixels + 1)[:-1].astype(np.int64))
+    ends = np.append(starts[1:], len(x)) - 1
+
+    y_min = np.minimum.reduceat(y, starts)
+    y_max = np.maximum.reduceat(y, starts)
+    x_mid = (x[starts] + x[ends]) / 2
+
+    envelope_x = np.column_stack([x[starts], x_mid, x_mid, x[ends]]).ravel()
+    envelope_y = np.column_stack([y[starts], y_min, y_max, y[ends]]).ravel()
+    return envelope_x, envelope_y
+
+
+def plot_decimated(ax, x, y, pyramid=None, **kwargs):
+    """Plot (x, y) on ax through the decimation stage and keep the full-resolution arrays.
+
+    When a MinMaxPyramid of y is given, zooming and panning read from it instead of the raw samples.
+    """
+    source = LineSource(x, y, pyramid)
+    if len(source.x):
+        x_min, x_max = np.min(source.x), np.max(source.x)
+    else:
+        x_min, x_max = 0, 0
+    x_data, y_data = source.envelope(x_min, x_max, pixel_width(ax))
+
+    line, = ax.plot(x_data, y_data, **kwargs)
+    _line_sources[line] = source
+
+    # Re-decimate whenever the visible X range of this axes changes (zoom, pan, toolbar)
+    watch_axes(ax)
+    return line
+
+
+def set_line_source(line, x, y, pyramid=None):
+    """Replace the full-resolution data of an existing line in place (no new artist is created)."""
+    source = LineSource(x, y, pyramid)
+    _line_sources[line] = source
+    if len(source.x):
+        line.set_data(*source.envelope(np.min(source.x), np.max(source.x), pixel_width(line.axes)))
+    else:
+        line.set_data([], [])
+
+
+def watch_axes(ax):
+    """Re-decimate the lines of ax on every X-limit change (connecting twice is a no-op)."""
+    ax.callbacks.connect('xlim_changed', redecimate_axes)
+
+
+def redecimate_axes(ax):
+    """Recompute the envelope of every decimated line on ax for its current X limits."""
+    x_min, x_max = sorted(ax.get_xlim())
+    n_pixels = pixel_width(ax)
+    for line in ax.get_lines():
+        source = _line_sources.get(line)
+        if source is None:
+            continue  # Not a decimated line
+        line.set_data(*source.envelope(x_min, x_max, n_pixels))
+
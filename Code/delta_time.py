@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class DeltaResult:
+    """Delta time of a lap against a reference lap on a common distance grid.
+
+    delta is the time the lap is behind the reference at each grid distance (negative: ahead);
+    gained and lost accumulate the time won and dropped along the lap, so delta == lost - gained.
+    """
+
+    def __init__(self, grid, delta):
+        self.grid = grid
+        self.delta = delta
+        steps = np.diff(delta, prepend=0.0)
+        self.gained = np.cumsum(np.maximum(-steps, 0.0))
+        self.lost = np.cumsum(np.maximum(steps, 0.0))
+
+    @property
+    def final_delta(self):
+        return float(self.delta[-1]) if len(self.delta) else 0.0
+
+    @property
+    def total_gained(self):
+        """Time won over the whole lap, summed over every stretch where the lap pulled ahead."""
+        return float(self.gained[-1]) if len(self.gained) else 0.0
+
+    @property
+    def total_lost(self):
+        """Time dropped over the whole lap, summed over every stretch where the lap fell behind."""
+        return float(self.lost[-1]) if len(self.lost) else 0.0
+
+
+def delta_time(grid, elapsed, reference_elapsed):
+    """Return the DeltaResult of a lap against a reference lap, both timed on the same distance grid.
+
+    elapsed and reference_elapsed are the times at the grid points from the start of each lap;
+    the comparison ends with the shorter of the two laps.
+    """
+    n = min(len(elapsed), len(reference_elapsed))
+    if n < 2:
+        return DeltaResult(np.zeros(0), np.zeros(0))
+    return DeltaResult(grid[:n], elapsed[:n] - reference_elapsed[:n])
+
+
+class DeltaCache:
+    """Delta time results memoized per (dataset, lap, reference dataset, reference lap, grid step).
+
+    The time of each lap over the distance grid comes from the ResamplingService, so a lap is
+    resampled once however many deltas it appears in. Entries stay valid until the lap tables
+    change (clear()), so redrawing, relayouting or switching plot areas never recomputes a delta.
+    """
+
+    def __init__(self, resampler):
+        self.resampler = resampler
+        self.results = {}
+
+    def lap(self, app, dataset_index, lap, step):
+        """Return (grid, time from the lap start) of a lap on the distance grid."""
+        dataset_name = app.dataset_names[dataset_index]
+        grid, elapsed = self.resampler.resample(dataset_name, app.channel_stores[dataset_index],
+                                                app.auto_selected_time_channel.get(dataset_name),
+                                                app.auto_selected_distance_channel.get(dataset_name),
+                                                'distance', step, app.lap_tables[dataset_index].segment(lap))
+        return grid, elapsed - elapsed[0] if len(elapsed) else elapsed
+
+    def delta(self, app, dataset_index, lap, reference_index, reference_lap, step=None):
+        """Return the DeltaResult of a lap against a reference lap, computing it on first use.
+
+        Laps are compared on the common distance grid (resampler.steps['distance']) unless a step is given.
+        """
+        step = step or self.resampler.steps['distance']
+        key = (dataset_index, lap, reference_index, reference_lap, step)
+        if key not in self.results:
+            grid, elapsed = self.lap(app, dataset_index, lap, step)
+            _, reference_elapsed = self.lap(app, reference_index, reference_lap, step)
+            self.results[key] = delta_time(grid, elapsed, reference_elapsed)
+        return self.results[key]
+
+    def clear(self):
+        self.results.clear()
@@ -0,0 +1,59 @@
+import tkinter as tk
+from matplotlib.figure import Figure
+
+
+class FigureRegistry:
+    """Owns every figure of the application together with its canvas and toolbar.
+
+    Figures are created without pyplot, so nothing keeps them alive once the registry
+    releases them; a released figure is cleared and its Tk widgets are destroyed.
+    """
+
+    def __init__(self):
+        self.entries = {}  # Key -> {'figure', 'canvas', 'toolbar'}
+
+    def new_figure(self, key, **kwargs):
+        """Create a figure registered under key, releasing any figure previously registered there."""
+        self.release(key)
+        figure = Figure(**kwargs)
+        self.entries[key] = {'figure': figure, 'canvas': None, 'toolbar': None}
+        return figure
+
+    def attach(self, key, canvas=None, toolbar=None):
+        """Record the canvas and toolbar that display the figure registered under key."""
+        self.entries[key]['canvas'] = canvas
+        self.entries[key]['toolbar'] = toolbar
+
+    def bind_to_window(self, key, window):
+        """Release the figure registered under key when its Toplevel window is destroyed."""
+        def on_destroy(event):
+            if event.widget is window:
+                self.release(key)
+        window.bind("<Destroy>", on_destroy, add="+")
+
+    def release(self, key):
+        """Close the figure registered under key and drop every reference to it."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        for widget_owner in (entry['toolbar'], entry['canvas']):
+            if widget_owner is None:
+                continue
+            widget = widget_owner.get_tk_widget() if hasattr(widget_owner, 'get_tk_widget') else widget_owner
+            try:
+                widget.destroy()
+            except tk.TclError:
+                pass  # Already destroyed together with its window
+
+        # Drop the artists so nothing that still references the figure keeps them alive
+        entry['figure'].clear()
+
+    def release_all(self):
+        for key in list(self.entries):
+            self.release(key)
+
+    def stats(self):
+        """Return the number of live figures and the number of artists they hold."""
+        artists = sum(len(entry['figure'].findobj()) for entry in self.entries.values())
+        return {'figures': len(self.entries), 'artists': artists}
@@ -0,0 +1,182 @@
+import numpy as np
+
+# Channel name keywords used to pick the lap splitting method
+LAP_COUNTER_KEYWORDS = ["lap number", "lap count", "lap no"]
+BEACON_KEYWORDS = ["beacon"]
+LATITUDE_KEYWORDS = ["latitude", "gps lat"]
+LONGITUDE_KEYWORDS = ["longitude", "gps lon"]
+
+MIN_LAP_SECONDS = 10.0  # Beacon pulses or line crossings closer than this are the same crossing
+
+
+def detect_channel(columns, keywords):
+    """Return the first channel whose lower-case name contains one of keywords, or None."""
+    for channel in columns:
+        if any(keyword in channel.lower() for keyword in keywords):
+            return channel
+    return None
+
+
+def format_lap_time(seconds):
+    """Format a lap time as m:ss.000."""
+    if not np.isfinite(seconds):
+        return "--:--.---"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)}:{seconds:06.3f}"
+
+
+def counter_boundaries(counter):
+    """Return the samples where a lap counter channel increases."""
+    return np.flatnonzero(np.diff(counter) > 0) + 1
+
+
+def distance_boundaries(distance):
+    """Return the samples where a lap distance channel drops back by more than half a lap."""
+    if not np.isfinite(distance).any():
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.diff(distance) < -0.5 * np.nanmax(distance)) + 1
+
+
+def beacon_boundaries(beacon):
+    """Return the samples where a beacon channel rises above zero."""
+    return np.flatnonzero((beacon[1:] > 0) & ~(beacon[:-1] > 0)) + 1
+
+
+def line_crossings(x, y, line):
+    """Return (samples, fractions) where the track (x, y) crosses the segment line = (x1, y1, x2, y2).
+
+    A crossing between samples i - 1 and i is returned as sample i and the fraction of the
+    way from i - 1 to i at which the line was crossed.
+    """
+    x1, y1, x2, y2 = line
+    # Side of the start/finish line each sample is on (sign of the cross product)
+    side = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+    before, after = side[:-1], side[1:]
+    crossing = np.flatnonzero((before < 0) & (after >= 0) | (before >= 0) & (after < 0))
+
+    fractions = before[crossing] / (before[crossing] - after[crossing])
+    # Keep only crossings within the segment itself, not its extension through the whole map
+    cross_x = x[crossing] + fractions * (x[crossing + 1] - x[crossing])
+    cross_y = y[crossing] + fractions * (y[crossing + 1] - y[crossing])
+    length_squared = (x2 - x1) ** 2 + (y2 - y1) ** 2
+    along = ((cross_x - x1) * (x2 - x1) + (cross_y - y1) * (y2 - y1)) / length_squared if length_squared else np.zeros(len(crossing))
+    on_segment = (along >= 0) & (along <= 1)
+    return crossing[on_segment] + 1, fractions[on_segment]
+
+
+def debounce(boundaries, boundary_times, min_seconds=MIN_LAP_SECONDS):
+    """Drop boundaries that follow the previous kept boundary within min_seconds."""
+    keep = []
+    last_time = -np.inf
+    for i, boundary_time in enumerate(boundary_times):
+        if boundary_time - last_time >= min_seconds or not np.isfinite(boundary_time):
+            keep.append(i)
+            last_time = boundary_time
+    return boundaries[keep], boundary_times[keep]
+
+
+class LapTable:
+    """The laps of one dataset as index ranges [start, stop) into its channel arrays.
+
+    Laps are never copied: slicing a channel of the ChannelStore with lap_slice() gives a view.
+    The segment before the first boundary is the out lap and the one after the last is the in lap.
+    """
+
+    def __init__(self, boundaries, n_samples, time_values=None, boundary_times=None, method="session"):
+        boundaries = np.asarray(boundaries, dtype=np.int64)
+        inside = (boundaries > 0) & (boundaries < n_samples)
+        boundaries = boundaries[inside]
+        if boundary_times is not None:
+            boundary_times = np.asarray(boundary_times)[inside]
+        self.method = method
+        self.starts = np.concatenate([[0], boundaries]).astype(np.int64)
+        self.stops = np.concatenate([boundaries, [n_samples]]).astype(np.int64)
+
+        if time_values is None or n_samples == 0:
+            self.lap_times = np.full(len(self.starts), np.nan)
+        else:
+            if boundary_times is None:
+                boundary_times = time_values[boundaries]
+            edge_times = np.concatenate([[time_values[0]], boundary_times, [time_values[-1]]])
+            self.lap_times = np.diff(edge_times)
+
+        # Only laps between two boundaries are full laps
+        self.complete = np.zeros(len(self.starts), dtype=bool)
+        self.complete[1:-1] = True
+
+    def __len__(self):
+        return len(self.starts)
+
+    def lap_slice(self, lap):
+        return slice(int(self.starts[lap]), int(self.stops[lap]))
+
+    def segment(self, lap):
+        """Return the (start, stop) sample range of a lap, hashable for cache keys."""
+        return int(self.starts[lap]), int(self.stops[lap])
+
+    def label(self, lap):
+        if len(self) == 1:
+            return "Session"
+        if lap == 0:
+            return "Out lap"
+        if lap == len(self) - 1:
+            return "In lap"
+        return f"Lap {lap}"
+
+    def best_lap(self):
+        """Return the index of the fastest full lap, or None."""
+        times = np.where(self.complete & np.isfinite(self.lap_times), self.lap_times, np.inf)
+        return int(np.argmin(times)) if np.isfinite(times).any() else None
+
+
+def segment_laps(store, time_channel=None, distance_channel=None, start_finish=None):
+    """Split a dataset into laps in one vectorized pass and return its LapTable.
+
+    The method is picked from what the dataset offers: a GPS start/finish line when one is
+    given, then a lap counter channel, distance resets, a beacon channel, and finally the
+    whole session as one lap.
+    """
+    time_values = store.coerce(time_channel)[0] if time_channel in store else None
+    samples = time_values  # A coerced channel of the dataset, whose length is the sample count
+
+    boundaries = np.zeros(0, dtype=np.int64)
+    boundary_times = None
+    method = "session"
+    jittery = False  # Beacon pulses and GPS crossings can repeat within one pass of the line
+
+    latitude = detect_channel(store.columns, LATITUDE_KEYWORDS)
+    longitude = detect_channel(store.columns, LONGITUDE_KEYWORDS)
+    counter = detect_channel(store.columns, LAP_COUNTER_KEYWORDS)
+    beacon = detect_channel(store.columns, BEACON_KEYWORDS)
+
+    if start_finish is not None and latitude and longitude:
+        samples = store.coerce(longitude)[0]
+        boundaries, fractions = line_crossings(samples, store.coerce(latitude)[0], start_finish)
+        if time_values is not None:
+            # Interpolate the crossing time between the two samples around the line
+            boundary_times = time_values[boundaries - 1] + fractions * (time_values[boundaries] - time_values[boundaries - 1])
+        method = "start/finish line"
+        jittery = True
+    elif counter:
+        samples = store.coerce(counter)[0]
+        boundaries = counter_boundaries(samples)
+        method = f"lap counter '{counter}'"
+    elif distance_channel in store and len(distance_boundaries(store.coerce(distance_channel)[0])):
+        samples = store.coerce(distance_channel)[0]
+        boundaries = distance_boundaries(samples)
+        method = f"distance resets of '{distance_channel}'"
+    elif beacon:
+        samples = store.coerce(beacon)[0]
+        boundaries = beacon_boundaries(samples)
+        method = f"beacon '{beacon}'"
+        jittery = True
+
+    if time_values is not None:
+        if boundary_times is None:
+            boundary_times = time_values[boundaries]
+        if jittery:
+            boundaries, boundary_times = debounce(boundaries, boundary_times)
+
+    # Counted only after a channel was coerced: a lazily imported dataset reads its samples on first use
+    n_samples = len(samples) if samples is not None else len(store.df)
+    return LapTable(boundaries, n_samples, time_values, boundary_times, method)
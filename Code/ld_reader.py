@@ -0,0 +1,168 @@
+import struct
+import numpy as np
+import pandas as pd
+
+# Layout of the MoTeC i2 .ld file header
+LD_HEADER = struct.Struct('<'
+                          'I4x'     # File marker
+                          'II'      # Channel metadata pointer, channel data pointer
+                          '20x'
+                          'I'       # Event pointer
+                          '24x'
+                          'HHH'
+                          'I'       # Device serial
+                          '8s'      # Device type
+                          'H'       # Device version
+                          'H'
+                          'I'       # Number of channels
+                          '4x'
+                          '16s16x'  # Date
+                          '16s16x'  # Time
+                          '64s'     # Driver
+                          '64s64x'  # Vehicle
+                          '64s64x'  # Venue
+                          '1024x'
+                          'I'       # Pro logging flag
+                          '66x'
+                          '64s126x')  # Short comment
+
+# Layout of one channel metadata record (records form a linked list)
+LD_CHANNEL = struct.Struct('<'
+                           'IIII'   # Previous record, next record, data pointer, number of samples
+                           'H'      # Counter
+                           'HHH'    # Data type class, data type size, sample frequency
+                           'hhhh'   # Shift, multiplier, scale, decimal places
+                           '32s'    # Name
+                           '8s'     # Short name
+                           '12s'    # Unit
+                           '40x')
+
+LD_MARKER = 0x40
+
+# Sample types by data type class and size in bytes
+LD_FLOAT_TYPES = {2: np.float16, 4: np.float32}
+LD_INT_TYPES = {2: np.int16, 4: np.int32}
+
+
+def decode_text(raw):
+    return raw.split(b'\0', 1)[0].decode('latin-1').strip()
+
+
+def is_ld_file(file_path):
+    """Return True if file_path starts with the MoTeC i2 .ld file marker."""
+    with open(file_path, 'rb') as file:
+        marker = file.read(4)
+    return len(marker) == 4 and struct.unpack('<I', marker)[0] == LD_MARKER
+
+
+class LdChannel:
+    """Metadata of one logged channel and the location of its samples."""
+
+    def __init__(self, record):
+        (_, self.next_ptr, self.data_ptr, self.n_data, _, dtype_class, dtype_size, self.freq,
+         self.shift, self.mul, self.scale, self.dec, name, short_name, unit) = record
+
+        self.name = decode_text(name)
+        self.short_name = decode_text(short_name)
+        self.unit = decode_text(unit)
+
+        if dtype_class == 0x07:
+            self.dtype = LD_FLOAT_TYPES.get(dtype_size)
+        elif dtype_class in (0x00, 0x03, 0x05):
+            self.dtype = LD_INT_TYPES.get(dtype_size)
+        else:
+            self.dtype = None  # Unknown sample type, the channel is skipped
+
+    @property
+    def duration(self):
+        return self.n_data / self.freq if self.freq else 0.0
+
+    def read(self, buffer):
+        """Return the scaled samples of the channel from the file buffer."""
+        raw = np.frombuffer(buffer, dtype=self.dtype, count=self.n_data, offset=self.data_ptr)
+        values = raw.astype(np.float64)
+        # Stored value -> physical value, as MoTeC i2 does it
+        values /= self.scale if self.scale else 1
+        values *= 10.0 ** -self.dec
+        values += self.shift
+        values *= self.mul
+        return values
+
+
+class LdFile:
+    """Header and channel list of a MoTeC i2 .ld file; samples are memory-mapped and read per channel."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.buffer = np.memmap(file_path, dtype=np.uint8, mode='r')
+
+        header = LD_HEADER.unpack_from(self.buffer, 0)
+        if header[0] != LD_MARKER:
+            raise ValueError(f"{file_path} is not a MoTeC i2 .ld file")
+
+        self.date = decode_text(header[12])
+        self.time = decode_text(header[13])
+        self.driver = decode_text(header[14])
+        self.vehicle = decode_text(header[15])
+        self.venue = decode_text(header[16])
+        self.comment = decode_text(header[18])
+
+        # Walk the linked list of channel records
+        self.channels = []
+        pointer = header[1]
+        seen = set()
+        while pointer and pointer not in seen and pointer + LD_CHANNEL.size <= len(self.buffer):
+            seen.add(pointer)
+            channel = LdChannel(LD_CHANNEL.unpack_from(self.buffer, pointer))
+            if channel.dtype is not None and channel.freq > 0 and channel.n_data > 0:
+                self.channels.append(channel)
+            pointer = channel.next_ptr
+
+        # Channel names become column names, so make them unique
+        counts = {}
+        for channel in self.channels:
+            count = counts.get(channel.name, 0)
+            counts[channel.name] = count + 1
+            if count:
+                channel.name = f"{channel.name} {count + 1}"
+
+        # All channels are resampled onto one time base at the highest logged frequency
+        self.freq = max((channel.freq for channel in self.channels), default=1)
+        duration = max((channel.duration for channel in self.channels), default=0.0)
+        self.time_base = np.arange(int(round(duration * self.freq))) / self.freq
+
+    def columns(self):
+        return ["Time"] + [channel.name for channel in self.channels]
+
+    def resample(self, channel):
+        """Return the samples of channel on the common time base."""
+        values = channel.read(self.buffer)
+        if channel.freq == self.freq and len(values) == len(self.time_base):
+            return values
+
+        if np.issubdtype(channel.dtype, np.integer):
+            # Hold integer channels (gear, flags, counters) instead of inventing values in between
+            index = np.minimum((self.time_base * channel.freq).astype(np.int64), len(values) - 1)
+            return values[index]
+
+        channel_time = np.arange(len(values)) / channel.freq
+        return np.interp(self.time_base, channel_time, values)
+
+
+def read_ld_file(file_path, channels=None, precise=None):
+    """Read a MoTeC i2 .ld file into a DataFrame with a Time column and one column per channel.
+
+    channels optionally limits which channels are read; precise is an optional predicate on
+    the channel name for channels that keep float64 samples (everything else is float32).
+    """
+    ld_file = LdFile(file_path)
+    columns = {"Time": ld_file.time_base}
+
+    for channel in ld_file.channels:
+        if channels is not None and channel.name not in channels:
+            continue
+        values = ld_file.resample(channel)
+        columns[channel.name] = values if precise and precise(channel.name) else values.astype(np.float32)
+
+    print(f"Read {len(columns) - 1} channels at {ld_file.freq} Hz from {file_path} ({ld_file.venue}, {ld_file.date})")
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,391 @@
+import argparse
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+from decimation import minmax_envelope, pixel_width
+
+LIVE_CAPACITY = 65536  # Samples kept per channel
+LIVE_FPS = 30  # Maximum redraw rate of live plots
+LIVE_WINDOW = 10.0  # Seconds shown in a live plot
+DEFAULT_PORT = 5005
+
+# Data datagrams: magic, sequence number and row count, then rows of a little-endian float64 Time
+# followed by float32 samples of the other channels. float32 cannot resolve single samples at
+# 1 kHz after a couple of hours of session time, so Time keeps its full precision on the wire.
+# Schema datagrams are JSON objects {"channels": [...]} and are sent before and between data.
+PACKET_HEADER = struct.Struct('<4sII')
+PACKET_MAGIC = b'ORP2'
+RECEIVE_BUFFER_BYTES = 4 * 1024 * 1024  # Socket buffer that absorbs bursts while the Tk thread draws
+RECEIVE_QUEUE_BLOCKS = 2048  # Blocks waiting for the Tk thread; newer blocks are dropped while it stalls
+
+
+def row_dtype(n_channels):
+    """Return the dtype of one data row of n_channels channels (Time first)."""
+    return np.dtype([('time', '<f8'), ('values', '<f4', (n_channels - 1,))])
+
+
+def pack_data(sequence, block):
+    """Return the data datagram for an (n rows, n channels) block of samples."""
+    rows = np.empty(len(block), dtype=row_dtype(block.shape[1]))
+    rows['time'] = block[:, 0]
+    rows['values'] = block[:, 1:]
+    return PACKET_HEADER.pack(PACKET_MAGIC, sequence, len(block)) + rows.tobytes()
+
+
+def unpack_rows(datagram, rows, n_channels):
+    """Return the (rows, n_channels) float64 block of a data datagram; raises ValueError if it does not fit."""
+    dtype = row_dtype(n_channels)
+    if len(datagram) - PACKET_HEADER.size != rows * dtype.itemsize:
+        raise ValueError("The data block does not match the schema")
+    records = np.frombuffer(datagram, dtype=dtype, offset=PACKET_HEADER.size)
+    block = np.empty((rows, n_channels), dtype=np.float64)
+    block[:, 0] = records['time']
+    block[:, 1:] = records['values']
+    return block
+
+
+class RingBuffer:
+    """Fixed-capacity sample buffer; the oldest samples are overwritten, memory never grows."""
+
+    def __init__(self, capacity, dtype=np.float32):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.count = 0  # Samples appended since the start
+
+    def extend(self, values):
+        n = len(values)
+        if n >= self.capacity:
+            # Only the newest capacity samples survive, keep them at their ring positions
+            positions = np.arange(self.count + n - self.capacity, self.count + n) % self.capacity
+            self.data[positions] = values[-self.capacity:]
+        else:
+            start = self.count % self.capacity
+            first = min(n, self.capacity - start)
+            self.data[start:start + first] = values[:first]
+            self.data[:n - first] = values[first:]
+        self.count += n
+
+    def latest(self, n):
+        """Return the newest n samples in order (a view unless they wrap around the end)."""
+        n = min(n, self.count, self.capacity)
+        end = self.count % self.capacity or (self.capacity if self.count else 0)
+        start = end - n
+        if start >= 0:
+            return self.data[start:end]
+        return np.concatenate([self.data[start:], self.data[:end]])
+
+
+class LiveDataset:
+    """One ring buffer per channel of a live source; the first channel is the time base."""
+
+    def __init__(self, channels, capacity=LIVE_CAPACITY):
+        self.channels = list(channels)
+        self.time_channel = self.channels[0]
+        self.buffers = {channel: RingBuffer(capacity, np.float64 if channel == self.time_channel else np.float32)
+                        for channel in self.channels}
+
+    @property
+    def count(self):
+        return self.buffers[self.time_channel].count
+
+    def append_rows(self, block):
+        """Append an (n rows, n channels) block of samples."""
+        for i, channel in enumerate(self.channels):
+            self.buffers[channel].extend(block[:, i])
+
+
+class UdpSource:
+    """Receives live samples over UDP on a background thread and queues them for the Tk thread."""
+
+    def __init__(self, port=DEFAULT_PORT, host='0.0.0.0'):
+        self.port = port
+        self.host = host
+        self.items = queue.Queue(maxsize=RECEIVE_QUEUE_BLOCKS)  # ('schema', channels) or ('data', receive time, block)
+        self.lost_packets = 0
+        self.dropped_blocks = 0  # Blocks received while the queue was full (the Tk thread fell behind)
+        self.bad_packets = 0  # Datagrams that were not a schema or a data block of the current schema
+        self.packets = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+        self.socket.bind((self.host, self.port))
+        self.socket.settimeout(0.2)  # Wake up regularly to notice stop()
+        self.thread = threading.Thread(target=self.receive, daemon=True)
+        self.thread.start()
+        print(f"Listening for live telemetry on UDP port {self.port}")
+
+    def receive(self):
+        expected = None
+        channels = None
+        while not self.stop_event.is_set():
+            try:
+                datagram = self.socket.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            try:
+                if datagram[:4] != PACKET_MAGIC:
+                    schema = json.loads(datagram)['channels']
+                    if not isinstance(schema, list) or not schema or not all(isinstance(name, str) for name in schema):
+                        raise ValueError("A schema is a list of channel names, the time channel first")
+                    if schema != channels:
+                        channels = schema
+                        self.put_schema(channels)
+                    continue
+                if channels is None:
+                    continue  # Data before the first schema cannot be assigned to channels
+
+                _, sequence, rows = PACKET_HEADER.unpack_from(datagram)
+                block = unpack_rows(datagram, rows, len(channels))
+            except (ValueError, KeyError, TypeError, struct.error):
+                # A stray or corrupt datagram must not end the receiving thread
+                self.bad_packets += 1
+                continue
+
+            if expected is not None and sequence != expected:
+                self.lost_packets += (sequence - expected) % 2 ** 32
+            expected = (sequence + 1) % 2 ** 32
+            self.packets += 1
+            try:
+                self.items.put_nowait(('data', time.perf_counter(), block))
+            except queue.Full:
+                self.dropped_blocks += 1
+
+    def put_schema(self, channels):
+        """Queue a schema change; unlike data it is never dropped, the thread waits for room instead."""
+        while not self.stop_event.is_set():
+            try:
+                self.items.put(('schema', channels), timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def drain(self):
+        """Return every item queued since the last call."""
+        items = []
+        try:
+            while True:
+                items.append(self.items.get_nowait())
+        except queue.Empty:
+            return items
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.socket.close()
+
+    def describe(self):
+        return (f"{self.packets} packets received, {self.lost_packets} lost, {self.bad_packets} bad, "
+                f"{self.dropped_blocks} dropped while drawing fell behind")
+
+
+class LivePlotter:
+    """Draws the newest samples of a live source into the plot areas at a capped frame rate.
+
+    The X axis shows seconds relative to the newest sample, so the axes stay put and only
+    the lines are redrawn (blitted) each frame; a full draw happens only when a Y range grows.
+    """
+
+    def __init__(self, app, source, bindings=None, fps=LIVE_FPS, window=LIVE_WINDOW):
+        self.app = app
+        self.source = source
+        self.bindings = bindings or []  # Channel names per plot area, empty binds one channel per area
+        self.interval = 1.0 / fps
+        self.window = window
+        self.dataset = None
+        self.lines = {}  # Axes -> [(channel, Line2D)]
+        self.backgrounds = {}
+        self.after_id = None
+        self.draw_cid = None
+
+        # Instrumentation
+        self.frames = 0
+        self.samples = 0
+        self.started = None
+        self.last_frame = None  # Time of the newest frame, so idle time after a finished replay is not counted
+        self.latencies = []  # Seconds from receiving a block to showing it, per frame
+
+    def start(self):
+        self.source.start()
+        self.draw_cid = self.app.canvas.mpl_connect("draw_event", self.on_draw)
+        self.started = time.perf_counter()
+        self.tick()
+
+    def stop(self):
+        if self.after_id is not None:
+            self.app.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.source.stop()
+        if self.draw_cid is not None:
+            self.app.canvas.mpl_disconnect(self.draw_cid)
+            self.draw_cid = None
+
+        # Leave the last frame on screen as ordinary lines
+        for ax_lines in self.lines.values():
+            for _, line in ax_lines:
+                line.set_animated(False)
+        self.app.canvas.draw_idle()
+        print(f"Live stream stopped: {self.describe()}")
+
+    def tick(self):
+        """Move queued samples into the ring buffers and redraw, then schedule the next frame."""
+        frame_start = time.perf_counter()
+        blocks = []
+        oldest = None
+        for item in self.source.drain():
+            if item[0] == 'schema':
+                self.flush(blocks)
+                blocks = []
+                self.setup(item[1])
+            elif self.dataset is not None:
+                blocks.append(item[2])
+                oldest = item[1] if oldest is None else oldest
+
+        if blocks:
+            self.flush(blocks)
+            self.redraw()
+            self.latencies.append(time.perf_counter() - oldest)
+            del self.latencies[:-1000]
+
+        elapsed = time.perf_counter() - frame_start
+        self.after_id = self.app.root.after(max(1, int((self.interval - elapsed) * 1000)), self.tick)
+
+    def flush(self, blocks):
+        if blocks and self.dataset is not None:
+            block = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+            self.dataset.append_rows(block)
+            self.samples += len(block)
+
+    def setup(self, channels):
+        """Create the live dataset and bind its channels to the plot areas."""
+        self.dataset = LiveDataset(channels)
+        self.lines = {}
+        # The stream replaces whatever was plotted; drop the traces so the plot model matches the figure
+        self.app.plot_model.clear()
+        for area_index, ax in enumerate(self.app.axes):
+            if area_index < len(self.bindings):
+                area_channels = [channel for channel in self.bindings[area_index] if channel in self.dataset.buffers]
+            else:
+                area_channels = channels[area_index + 1:area_index + 2]  # One channel per area by default
+
+            ax.clear()
+            self.app.configure_axes(ax)
+            self.lines[ax] = []
+            for channel in area_channels:
+                line, = ax.plot([], [], label=channel, animated=True)
+                self.lines[ax].append((channel, line))
+            ax.set_xlim(-self.window, 0)
+            ax.set_ylim(0, 1)
+            ax.set_xlabel(f"{self.dataset.time_channel} (s before the newest sample)")
+            if area_channels:
+                ax.legend(loc='upper left')
+        self.app.canvas.draw()
+
+    def on_draw(self, event):
+        """Cache the backgrounds after a full draw and put the live lines back on top."""
+        self.backgrounds = {ax: self.app.canvas.copy_from_bbox(ax.bbox) for ax in self.lines}
+        self.blit()
+
+    def redraw(self):
+        """Update every bound line from the ring buffers and blit, or do a full draw if a Y range grew."""
+        time_values = self.dataset.buffers[self.dataset.time_channel].latest(LIVE_CAPACITY)
+        if not len(time_values):
+            return
+        x = time_values - time_values[-1]
+
+        rescale = False
+        for ax, ax_lines in self.lines.items():
+            y_low, y_high = ax.get_ylim()
+            # The envelope keeps four points per column, so half the pixel width keeps about two points per pixel
+            n_columns = max(pixel_width(ax) // 2, 1)
+            for channel, line in ax_lines:
+                y = self.dataset.buffers[channel].latest(len(x))
+                line.set_data(*minmax_envelope(x, y, -self.window, 0, n_columns))
+
+                visible = y[x >= -self.window]
+                if len(visible) and (visible.min() < y_low or visible.max() > y_high):
+                    # Grow with a generous margin, at least half the current span so steadily rising
+                    # channels (distance, lap time) need only a few full redraws
+                    margin = max(0.25 * (visible.max() - visible.min()), 0.5 * (y_high - y_low), 1e-6)
+                    y_low, y_high = min(y_low, visible.min() - margin), max(y_high, visible.max() + margin)
+                    ax.set_ylim(y_low, y_high)
+                    rescale = True
+
+        self.frames += 1
+        self.last_frame = time.perf_counter()
+        if rescale:
+            self.app.canvas.draw()  # New ticks, on_draw blits the lines
+        else:
+            self.blit()
+
+    def blit(self):
+        canvas = self.app.canvas
+        for ax, ax_lines in self.lines.items():
+            background = self.backgrounds.get(ax)
+            if background is None:
+                continue
+            canvas.restore_region(background)
+            for _, line in ax_lines:
+                ax.draw_artist(line)
+            canvas.blit(ax.bbox)
+
+    def describe(self):
+        """Summarize the sustained frame rate, the sample rate and the display latency."""
+        duration = max(self.last_frame - self.started, 1e-9) if self.last_frame else 1e-9
+        latency = f"{np.median(self.latencies) * 1000:.1f} ms median latency" if self.latencies else "no frames"
+        return (f"{self.frames / duration:.1f} fps, {self.samples / duration:.0f} samples/s per channel, "
+                f"{latency}, {self.source.describe()}")
+
+
+def send_synthetic(port=DEFAULT_PORT, host='127.0.0.1', rate=1000, n_channels=100, rows_per_packet=10, duration=None):
+    """Send sine-wave telemetry over UDP to test the live mode without a car."""
+    channels = ["Time"] + [f"Channel {i + 1}" for i in range(n_channels)]
+    schema = json.dumps({"channels": channels}).encode()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frequencies = np.linspace(0.1, 5, n_channels)
+
+    sequence = 0
+    start = time.perf_counter()
+    next_schema = start
+    sent_rows = 0
+    while duration is None or sent_rows < duration * rate:
+        now = time.perf_counter()
+        if now >= next_schema:
+            sender.sendto(schema, (host, port))  # Repeated so a late receiver can still start
+            next_schema = now + 1.0
+
+        # Send every row that is due, paced by the wall clock
+        due = int((now - start) * rate) - sent_rows
+        while due > 0:
+            rows = min(due, rows_per_packet)
+            t = (sent_rows + np.arange(rows)) / rate
+            block = np.empty((rows, n_channels + 1), dtype=np.float64)
+            block[:, 0] = t
+            block[:, 1:] = np.sin(2 * np.pi * frequencies * t[:, None]) * np.arange(1, n_channels + 1)
+            sender.sendto(pack_data(sequence, block), (host, port))
+            sequence = (sequence + 1) % 2 ** 32
+            sent_rows += rows
+            due -= rows
+        time.sleep(0.001)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Send synthetic live telemetry to OpenRacePlot over UDP.")
+    argument_parser.add_argument("--host", default='127.0.0.1')
+    argument_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    argument_parser.add_argument("--rate", type=float, default=1000, help="Rows per second")
+    argument_parser.add_argument("--channels", type=int, default=100)
+    argument_parser.add_argument("--duration", type=float, help="Seconds to send (default: until interrupted)")
+    args = argument_parser.parse_args()
+    send_synthetic(args.port, args.host, args.rate, args.channels, duration=args.duration)
@@ -0,0 +1,125 @@
+import ast
+import numpy as np
+
+from signal_processing import derivative, integral, lowpass, moving_average, resample, sg_derivative
+
+
+# Functions an expression may call; all of them work on whole arrays at once
+MATH_FUNCTIONS = {
+    'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+    'atan2': np.arctan2, 'deg': np.degrees, 'rad': np.radians, 'sign': np.sign, 'round': np.round,
+    'floor': np.floor, 'ceil': np.ceil, 'min': np.minimum, 'max': np.maximum, 'clip': np.clip, 'where': np.where,
+    'derivative': derivative, 'integral': integral, 'sg_derivative': sg_derivative, 'lowpass': lowpass,
+    'moving_average': moving_average, 'resample': resample,
+}
+# (fewest, most) arguments of each function as written in an expression
+MATH_FUNCTION_ARGUMENTS = dict(
+    {name: (1, 1) for name in ['abs', 'sqrt', 'exp', 'log', 'log10', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan',
+                               'deg', 'rad', 'sign', 'floor', 'ceil', 'derivative', 'integral']},
+    atan2=(2, 2), min=(2, 2), max=(2, 2), round=(1, 2), clip=(3, 3), where=(3, 3),
+    sg_derivative=(1, 3), lowpass=(2, 3), moving_average=(2, 2), resample=(2, 2),
+)
+# Signal processing functions also get the dataset's time channel, as their first argument
+TIME_FUNCTIONS = {'derivative', 'integral', 'sg_derivative', 'lowpass', 'moving_average', 'resample'}
+MATH_CONSTANTS = {'pi': np.pi, 'e': np.e, 'g': 9.80665}
+
+# Syntax an expression may use: arithmetic, comparisons, calls of MATH_FUNCTIONS and channel names
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.Invert,
+    ast.UAdd, ast.USub, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+
+class ChannelReferences(ast.NodeTransformer):
+    """Validates an expression tree and replaces every channel reference by an input variable.
+
+    Channels are referenced by name, quoted when the name is not an identifier:
+    'Susp Pos FL' or Time.
+    """
+
+    def __init__(self, time_channel):
+        self.time_channel = time_channel
+        self.inputs = []
+
+    def input_name(self, channel):
+        if channel not in self.inputs:
+            self.inputs.append(channel)
+        return ast.Name(id=f"_input{self.inputs.index(channel)}", ctx=ast.Load())
+
+    def generic_visit(self, node):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"'{type(node).__name__}' is not allowed in a math channel")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            return self.input_name(node.value)
+        if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+            raise ValueError(f"Unsupported constant: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id in MATH_CONSTANTS:
+            return node
+        return self.input_name(node.id)
+
+    def visit_Compare(self, node):
+        if len(node.ops) != 1:
+            raise ValueError("Chained comparisons are not supported, combine them with & and |")
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in MATH_FUNCTIONS:
+            raise ValueError(f"Unknown function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise ValueError(f"{node.func.id}() takes no keyword arguments")
+        fewest, most = MATH_FUNCTION_ARGUMENTS[node.func.id]
+        if not fewest <= len(node.args) <= most:
+            expected = str(fewest) if fewest == most else f"{fewest} to {most}"
+            plural = "" if most == 1 else "s"
+            raise ValueError(f"{node.func.id}() takes {expected} argument{plural} ({len(node.args)} given)")
+        node.args = [self.visit(argument) for argument in node.args]
+        if node.func.id in TIME_FUNCTIONS:
+            if self.time_channel is None:
+                raise ValueError(f"{node.func.id}() needs a time channel")
+            node.args.insert(0, self.input_name(self.time_channel))
+        return node
+
+
+class MathChannel:
+    """A derived channel: an expression over other channels, parsed and compiled once.
+
+    inputs lists the channels the expression reads (raw or other math channels); the
+    ChannelStore evaluates it on whole arrays and keeps the result until an input changes.
+    """
+
+    def __init__(self, name, expression, time_channel=None):
+        self.name = name
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression: {e.msg}") from None
+        references = ChannelReferences(time_channel)
+        tree = ast.fix_missing_locations(references.visit(tree))
+        self.inputs = tuple(references.inputs)
+        self.code = compile(tree, f"<math channel {name}>", 'eval')
+
+    def evaluate(self, arrays, n_samples):
+        """Return the channel as a float array of n_samples, given the arrays of its inputs in order."""
+        namespace = {'__builtins__': {}, **MATH_FUNCTIONS, **MATH_CONSTANTS}
+        namespace.update((f"_input{i}", array) for i, array in enumerate(arrays))
+        try:
+            with np.errstate(all='ignore'):
+                result = eval(self.code, namespace)
+        except (TypeError, ArithmeticError, IndexError) as e:
+            # E.g. a channel passed where a number is expected, or 1 / 0 between constants
+            raise ValueError(f"Cannot evaluate '{self.expression}': {str(e)}") from None
+
+        values = np.array(np.broadcast_to(result, (n_samples,)))  # Constant expressions fill the channel
+        if values.dtype.kind != 'f':
+            values = values.astype(np.float64)
+        values[~np.isfinite(values)] = np.nan  # Division by zero and the like are invalid samples
+        return values
@@ -0,0 +1,288 @@
+import os
+import json
+import zlib
+import csv
+import mmap
+import argparse
+import numpy as np
+from typing import Iterator, List, Dict, Optional
+
+from ld_reader import is_ld_file
+from session_cache import session_cache
+
+MESSAGE_SIZE = 8  # Bytes per CAN message
+WINDOW_BYTES = 16 * 1024 * 1024  # Bytes decoded at a time when streaming a log
+
+# Frame layout of the MoTeC dash logger stream: a frame is 'messages' CAN messages that start
+# with 'header' and end with a big-endian CRC-32 of the preceding bytes. Each field is
+# (channel, message, byte offset in the message, width in bytes, endianness, scale, bit mask[, signed]);
+# signed is optional and False by default, set it for two's complement signals (e.g. steering angle).
+DEFAULT_FRAME_LAYOUT = {
+    'header': [130, 129, 128, 84],
+    'messages': 22,
+    'fields': [
+        ('rpm', 0, 4, 2, '>', 1, None), ('tps', 0, 6, 2, '>', 0.1, None),
+        ('manifold pressure', 1, 0, 2, '>', 0.1, None), ('air temp', 1, 2, 2, '>', 0.1, None),
+        ('engine temp', 1, 4, 2, '>', 0.1, None), ('lambda1', 1, 6, 2, '>', 0.001, None),
+        ('lambda2', 2, 0, 2, '>', 0.001, None), ('exhaust manifold pressure', 2, 2, 2, '>', 0.1, None),
+        ('mass air flow', 2, 4, 2, '>', 0.1, None), ('fuel temp', 2, 6, 2, '>', 0.1, None),
+        ('fuel pressure', 3, 0, 2, '>', 0.1, None), ('oil temp', 3, 2, 2, '>', 0.1, None),
+        ('oil pressure', 3, 4, 2, '>', 0.1, None), ('gear voltage', 3, 6, 2, '>', 0.01, None),
+        ('knock voltage', 4, 0, 2, '>', 0.1, None), ('gear shift force', 4, 2, 2, '>', 0.1, None),
+        ('exhaust temp1', 4, 4, 2, '>', 1, None), ('exhaust temp2', 4, 6, 2, '>', 1, None),
+        ('user channel1', 5, 0, 2, '>', 0.1, None), ('user channel2', 5, 2, 2, '>', 0.1, None),
+        ('user channel3', 5, 4, 2, '>', 0.1, None), ('user channel4', 5, 6, 2, '>', 0.1, None),
+        ('battery voltage', 6, 0, 2, '>', 0.01, None), ('ecu temp', 6, 2, 2, '>', 0.1, None),
+        ('digital input1 speed', 6, 4, 2, '>', 0.1, None), ('digital input2 speed', 6, 6, 2, '>', 0.1, None),
+        ('digital input3 speed', 7, 0, 2, '>', 0.1, None), ('digital input4 speed', 7, 2, 2, '>', 0.1, None),
+        ('drive speed', 7, 4, 2, '>', 0.1, None), ('ground speed', 7, 6, 2, '>', 0.1, None),
+        ('slip', 8, 0, 2, '>', 0.1, None), ('aim slip', 8, 2, 2, '>', 0.1, None),
+        ('launch rpm', 8, 4, 2, '>', 0.1, None),
+        ('gear', 14, 4, 2, '>', 1, None),
+        ('low battery', 16, 7, 1, '>', 1, 1), ('no sync', 16, 7, 1, '>', 1, 4),
+        ('sync', 16, 6, 1, '>', 1, 8), ('no ref', 16, 6, 1, '>', 1, 16),
+        ('ref', 16, 6, 1, '>', 1, 32), ('rpm over', 16, 6, 1, '>', 1, 64),
+    ],
+}
+
+
+def load_frame_layout(file_path: str) -> dict:
+    """Read a frame layout from a JSON file with the same keys as DEFAULT_FRAME_LAYOUT."""
+    with open(file_path) as file:
+        layout = json.load(file)
+    layout['fields'] = [tuple(field) for field in layout['fields']]
+    return layout
+
+
+class FrameLayout:
+    """A frame layout compiled once into a structured dtype and per-channel scales and masks."""
+
+    def __init__(self, layout: dict = DEFAULT_FRAME_LAYOUT):
+        self.header = tuple(layout['header'])
+        self.messages = layout['messages']
+        self.frame_size = self.messages * MESSAGE_SIZE
+        self.crc_size = self.frame_size - 4  # Bytes covered by the CRC-32 at the end of the frame
+
+        # Fields without the signed flag are unsigned
+        fields = [tuple(field) + (False,) * (8 - len(field)) for field in layout['fields']]
+        self.channels = [name for name, *_ in fields]
+        self.scales = {name: scale for name, _, _, _, _, scale, _, _ in fields}
+        self.masks = {name: mask for name, _, _, _, _, _, mask, _ in fields}
+
+        # Structured view of one frame, so a field of every frame is read in one NumPy operation
+        self.dtype = np.dtype({
+            'names': self.channels,
+            'formats': [f"{endianness}{'i' if signed else 'u'}{width}" for _, _, _, width, endianness, _, _, signed in fields],
+            'offsets': [message * MESSAGE_SIZE + offset for _, message, offset, _, _, _, _, _ in fields],
+            'itemsize': self.frame_size,
+        })
+
+    def decode(self, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """Decode an (n, frame_size) uint8 array of frames into one array per channel."""
+        records = np.ascontiguousarray(frames).view(self.dtype).ravel()
+        columns = {}
+        for name in self.channels:
+            values = records[name]
+            if self.masks[name] is not None:
+                values = values & self.masks[name]
+            columns[name] = values * self.scales[name] if self.scales[name] != 1 else values.astype(np.int64)
+        return columns
+
+
+class MoTeCParser:
+    def __init__(self, file_path: str, layout: dict = DEFAULT_FRAME_LAYOUT):
+        self.file_path = file_path
+        self.layout = FrameLayout(layout)
+        self.data = []
+        self.valid_frames = 0  # Frames decoded in the last parse
+        self.rejected_frames = 0  # Frame headers whose CRC did not match in the last parse
+        self.overlapping_frames = 0  # Valid-looking frames inside the payload of another frame
+
+    def read_file(self) -> bytes:
+        with open(self.file_path, 'rb') as file:
+            raw_data = file.read()
+        print(f"Read {len(raw_data)} bytes from {self.file_path}")
+        return raw_data
+
+    def find_frame_starts(self, raw_data: bytes) -> np.ndarray:
+        """Return the message indices where a complete frame header starts."""
+        n_messages = len(raw_data) // MESSAGE_SIZE
+        messages = np.frombuffer(raw_data, dtype=np.uint8, count=n_messages * MESSAGE_SIZE).reshape(n_messages, MESSAGE_SIZE)
+        is_start = np.all(messages[:, :len(self.layout.header)] == self.layout.header, axis=1)
+        starts = np.flatnonzero(is_start[:max(n_messages - self.layout.messages + 1, 0)])
+        return starts
+
+    def parse_data(self, raw_data: bytes) -> Dict[str, np.ndarray]:
+        """Decode every valid frame of raw_data into one array per channel."""
+        self.valid_frames = self.rejected_frames = self.overlapping_frames = 0
+        columns, _ = self.decode(raw_data)
+        self.report()
+        return columns
+
+    def iter_columns(self, window_bytes: int = WINDOW_BYTES) -> Iterator[Dict[str, np.ndarray]]:
+        """Memory-map the log and yield the decoded frames of one bounded window at a time."""
+        self.valid_frames = self.rejected_frames = self.overlapping_frames = 0
+        if os.path.getsize(self.file_path) == 0:
+            return
+
+        window_messages = max(window_bytes // MESSAGE_SIZE, self.layout.messages)
+        with open(self.file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            n_messages = len(mapped) // MESSAGE_SIZE
+            next_free = 0  # First message after the last valid frame, carried across windows
+            for first in range(0, n_messages, window_messages):
+                # Read one frame past the window so a frame that crosses its end is complete
+                stop = min(first + window_messages + self.layout.messages, n_messages)
+                window = memoryview(mapped)[first * MESSAGE_SIZE:stop * MESSAGE_SIZE]
+                columns, window_next_free = self.decode(window, window_messages, next_free - first)
+                window.release()
+                next_free = first + window_next_free
+                yield columns
+
+        self.report()
+
+    def decode(self, raw_data, stop_message: Optional[int] = None, next_free: int = 0):
+        """Decode the valid frames of raw_data whose header lies before stop_message.
+
+        next_free is the first message that is not part of an earlier frame. Returns the
+        columns and the updated next_free.
+        """
+        starts = self.find_frame_starts(raw_data)
+        if stop_message is not None:
+            starts = starts[starts < stop_message]
+        valid = self.crc_check(raw_data, starts)
+
+        # A frame whose header lies inside the previous valid frame is payload that looks like a header
+        valid_starts = []
+        for start in starts[valid].tolist():
+            if start >= next_free:
+                valid_starts.append(start)
+                next_free = start + self.layout.messages
+
+        self.valid_frames += len(valid_starts)
+        self.rejected_frames += int(np.count_nonzero(~valid))
+        self.overlapping_frames += int(np.count_nonzero(valid)) - len(valid_starts)
+        return self.extract_data(raw_data, np.asarray(valid_starts, dtype=np.int64)), next_free
+
+    def report(self):
+        print(f"{self.valid_frames} valid frames, {self.rejected_frames} failed the CRC check, "
+              f"{self.overlapping_frames} inside another frame")
+
+    def extract_data(self, raw_data: bytes, starts: np.ndarray) -> Dict[str, np.ndarray]:
+        """Decode the frames starting at the given message indices."""
+        raw = np.frombuffer(raw_data, dtype=np.uint8)
+        byte_index = starts[:, None] * MESSAGE_SIZE + np.arange(self.layout.frame_size)
+        return self.layout.decode(raw[byte_index])
+
+    def crc_check(self, raw_data: bytes, starts: np.ndarray) -> np.ndarray:
+        """Return a boolean mask of the frames (by start message index) whose CRC is correct.
+
+        The CRC-32 covers all but the last 4 bytes of a frame and is stored big-endian in those 4.
+        Frames are checksummed straight from a memoryview, so no frame bytes are copied.
+        """
+        view = memoryview(raw_data)
+        offsets = starts * MESSAGE_SIZE
+        crc_size = self.layout.crc_size
+        computed = np.fromiter((zlib.crc32(view[offset:offset + crc_size]) for offset in offsets.tolist()),
+                               dtype=np.uint32, count=len(offsets))
+
+        raw = np.frombuffer(raw_data, dtype=np.uint8)
+        stored = raw[offsets[:, None] + np.arange(crc_size, self.layout.frame_size)].copy().view('>u4').ravel()
+        return computed == stored
+
+class MoTeCCsvWriter:
+    def __init__(self, output_file: str, channels: Optional[List[str]] = None):
+        self.output_file = output_file
+        # Default to the channels of the built-in frame layout, in layout order
+        self.channels = channels or [field[0] for field in DEFAULT_FRAME_LAYOUT['fields']]
+
+    def open(self):
+        self.csvfile = open(self.output_file, 'w', newline='')
+        self.writer = csv.writer(self.csvfile)
+        self.writer.writerow(self.channels)
+
+    def write_columns(self, data: Dict[str, np.ndarray]):
+        """Append the rows of one decoded window."""
+        self.writer.writerows(zip(*(data[channel].tolist() for channel in self.channels)))
+
+    def close(self):
+        self.csvfile.close()
+        print(f"CSV file saved to {self.output_file}")
+
+    def abort(self):
+        """Close and delete a CSV file whose conversion failed, so no truncated log is left behind."""
+        self.csvfile.close()
+        os.remove(self.output_file)
+
+    def write_csv(self, data: Dict[str, np.ndarray]):
+        self.open()
+        self.write_columns(data)
+        self.close()
+
+
+class MoTeCCacheWriter:
+    """Writes the decoded channels straight into the session cache entry of the log file.
+
+    The entry is keyed on the content of the log, so importing the log afterwards serves the
+    decoded channels. An i2 .ld log is refused: its entry belongs to the channels ld_reader reads.
+    """
+
+    def __init__(self, input_file: str, cache=session_cache):
+        self.input_file = input_file
+        self.cache = cache
+
+    def open(self):
+        if is_ld_file(self.input_file):
+            raise ValueError(f"{self.input_file} is a MoTeC i2 log, import it directly instead of converting it")
+        self.entry = self.cache.writer(self.input_file)
+
+    def write_columns(self, data: Dict[str, np.ndarray]):
+        self.entry.append(data)
+
+    def close(self):
+        self.entry.close()  # Publishes the entry, so only called once every window was decoded
+
+    def abort(self):
+        self.entry.abort()
+
+
+class MoTeCConverter:
+    def __init__(self, parser: MoTeCParser, writer):
+        self.parser = parser
+        self.writer = writer
+
+    def convert(self, window_bytes: int = WINDOW_BYTES):
+        """Stream the log window by window into the writer; memory use does not grow with the log length."""
+        self.writer.open()
+        try:
+            for columns in self.parser.iter_columns(window_bytes):
+                self.writer.write_columns(columns)
+        except BaseException:
+            # A partial result must never look like a finished conversion
+            self.writer.abort()
+            raise
+        self.writer.close()
+        print(f"Conversion of {self.parser.file_path} complete!")
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Convert a MoTeC CAN frame log to CSV or to the OpenRacePlot session cache.")
+    argument_parser.add_argument("input_file", help="Log file to convert")
+    argument_parser.add_argument("output_file", nargs='?', help="CSV file to write (default: the input file name with .csv)")
+    argument_parser.add_argument("--cache", action='store_true', help="Write the session cache entry instead of a CSV file")
+    argument_parser.add_argument("--layout", help="JSON frame layout for loggers that differ from the built-in one")
+    argument_parser.add_argument("--window-mb", type=float, default=WINDOW_BYTES / 1024 ** 2, help="Size of the decoding window in MB")
+    args = argument_parser.parse_args()
+
+    # Create instances of the parser and writer
+    layout = load_frame_layout(args.layout) if args.layout else DEFAULT_FRAME_LAYOUT
+    parser = MoTeCParser(args.input_file, layout)
+    if args.cache:
+        if is_ld_file(args.input_file):
+            argument_parser.error(f"{args.input_file} is a MoTeC i2 log; --cache is only for CAN frame logs, import i2 logs directly")
+        writer = MoTeCCacheWriter(args.input_file)
+    else:
+        writer = MoTeCCsvWriter(args.output_file or os.path.splitext(args.input_file)[0] + ".csv", parser.layout.channels)
+
+    # Create the converter and perform the conversion
+    converter = MoTeCConverter(parser, writer)
+    converter.convert(int(args.window_mb * 1024 ** 2))
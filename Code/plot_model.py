@@ -0,0 +1,71 @@
+class Trace:
+    """One channel of one dataset drawn in a plot area."""
+
+    def __init__(self, dataset_name, channel, color, linewidth=None, x_channel=None, lap=None, reference=None):
+        self.dataset_name = dataset_name
+        self.channel = channel
+        self.color = color
+        self.linewidth = linewidth
+        self.x_channel = x_channel  # None follows the dataset's Distance/Time channel
+        self.lap = lap  # Index into the dataset's lap table, None draws the whole session
+        self.reference = reference  # (dataset name, lap) for a delta time trace of lap against that lap
+        self.line = None  # Line2D currently drawing this trace, if any
+
+
+class PlotArea:
+    """One stacked axes and the traces it shows."""
+
+    def __init__(self):
+        self.traces = []
+
+
+class PlotModel:
+    """Source of truth for what is plotted where: plot areas -> traces.
+
+    The figure is rendered from this model, so adding or removing plot areas and
+    switching the X axis never have to reconstruct the state from legend labels.
+    """
+
+    def __init__(self, num_areas=1):
+        self.areas = [PlotArea() for _ in range(num_areas)]
+
+    def add_area(self):
+        """Append an empty plot area and return its index."""
+        self.areas.append(PlotArea())
+        return len(self.areas) - 1
+
+    def remove_area(self, index=-1):
+        """Remove a plot area and return it (with its traces)."""
+        return self.areas.pop(index)
+
+    def clear(self):
+        """Drop every trace but keep the number of plot areas."""
+        for area in self.areas:
+            area.traces = []
+
+    def clear_area(self, index):
+        self.areas[index].traces = []
+
+    def add_trace(self, area_index, trace):
+        self.areas[area_index].traces.append(trace)
+        return trace
+
+    def find_trace(self, line):
+        """Return (area index, trace) of the trace drawn by line, or (None, None)."""
+        for area_index, area in enumerate(self.areas):
+            for trace in area.traces:
+                if trace.line is line:
+                    return area_index, trace
+        return None, None
+
+    def remove_trace(self, trace):
+        for area in self.areas:
+            if trace in area.traces:
+                area.traces.remove(trace)
+                return
+
+    def traces(self):
+        """Yield (area index, trace) for every trace in the model."""
+        for area_index, area in enumerate(self.areas):
+            for trace in area.traces:
+                yield area_index, trace
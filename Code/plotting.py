@@ -2,11 +2,16 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
 from tkinter import filedialog, Menu, ttk, simpledialog, messagebox
 import tkinter as tk
 import numpy as np
 from matplotlib.ticker import MaxNLocator
 
+from decimation import plot_decimated
+from plot_model import Trace
+from signal_processing import CORNERS
+
 def plot_data(self):
     """Plot data on the selected plot area, auto-selecting the first empty plot area if available."""
     if not self.dataframes or not self.plot_areas:
@@ -80,19 +85,19 @@ def plot_data(self):
 
             if dataset_name and plot_area and x_col and y_col:
                 dataset_index = self.dataset_names.index(dataset_name)
-                df = self.dataframes[dataset_index]
+                store = self.channel_stores[dataset_index]
 
                 # Check if the selected X and Y columns exist in the dataset
-                full_x_col = x_col if x_col in df.columns else None
-                full_y_col = y_col if y_col in df.columns else None
+                full_x_col = x_col if x_col in store else None
+                full_y_col = y_col if y_col in store else None
 
                 if not full_x_col or not full_y_col:
                     messagebox.showerror("Error", f"Invalid channels: {x_col}, {y_col}")
                     return
 
                 # Extract the selected data using the full channel names
-                x_data = pd.to_numeric(df[full_x_col], errors='coerce').dropna()
-                y_data = pd.to_numeric(df[full_y_col], errors='coerce').dropna()
+                x_data = store.numeric(full_x_col)
+                y_data = store.numeric(full_y_col)
 
                 # Check if there's valid data
                 if len(x_data) == 0 or len(y_data) == 0:
@@ -105,13 +110,19 @@ def plot_data(self):
 
                 # Clear the existing plot in the selected plot area
                 ax.clear()
+                self.plot_model.clear_area(plot_area_index)
 
                 # Store the min and max values for clamping panning and zooming
                 self.x_min, self.x_max = x_data.min(), x_data.max()
                 self.y_min, self.y_max = y_data.min(), y_data.max()
 
+                # Add the trace to the plot model; an X channel other than Distance/Time stays fixed
+                trace = Trace(dataset_name, full_y_col, self.dataset_colors[dataset_index],
+                              x_channel=None if full_x_col == self.auto_selected_x_channel.get(dataset_name) else full_x_col)
+                self.plot_model.add_trace(plot_area_index, trace)
+
                 # Plot the data on the selected plot area
-                ax.plot(x_data, y_data, label=f"{y_col} vs {x_col}", color=self.dataset_colors[dataset_index])
+                trace.line = plot_decimated(ax, x_data, y_data, pyramid=store.pyramid(full_y_col), label=f"{dataset_name}: {y_col} vs {x_col}", color=self.dataset_colors[dataset_index])
 
                 # Set title, labels, and legend
                 ax.set_title(f"{y_col} vs {x_col}")
@@ -130,13 +141,6 @@ def plot_data(self):
                 # Redraw the canvas
                 canvas.draw()
 
-                # Save the plot data after plotting so that it can be restored
-                self.save_plot_data()
-
-                # Ensure crosshair synchronization is set up after plotting
-                self.crosshair_lines = [[] for _ in self.axes]
-                self.canvas.mpl_connect("motion_notify_event", self.synchronize_crosshair)
-
                 select_window.destroy()
 
         except Exception as e:
@@ -157,7 +161,8 @@ def add_plot(app):
     app.plots = [[] for _ in range(app.num_plots)]
 
     app.figure.clear()
-    app.figure, app.ax = plt.subplots(app.num_plots, 1, figsize=(15, 7 * app.num_plots))
+    app.figure = Figure(figsize=(15, 7 * app.num_plots))  # Not registered with pyplot, so it is freed with the canvas
+    app.ax = app.figure.subplots(app.num_plots, 1)
 
     if isinstance(app.ax, np.ndarray):
         for i, ax in enumerate(app.ax):
@@ -188,7 +193,8 @@ def erase_plot(app):
         app.plots = old_plots
 
         app.figure.clear()
-        app.figure, app.ax = plt.subplots(app.num_plots, 1, figsize=(15, 7 * app.num_plots))
+        app.figure = Figure(figsize=(15, 7 * app.num_plots))
+        app.ax = app.figure.subplots(app.num_plots, 1)
 
         if isinstance(app.ax, np.ndarray):
             for i, ax in enumerate(app.ax):
@@ -286,21 +292,21 @@ def plot_track_report(app):
 
             if dataset_name and plot_area and x_col and y_col and throttle_col:
                 dataset_index = app.dataset_names.index(dataset_name)
-                df = app.dataframes[dataset_index]
+                store = app.channel_stores[dataset_index]
 
                 # Clean the column names without dataset index
                 clean_x_col = x_col.split('##')[0]
                 clean_y_col = y_col.split('##')[0]
                 clean_throttle_col = throttle_col.split('##')[0]
 
-                if clean_x_col not in df.columns or clean_y_col not in df.columns or clean_throttle_col not in df.columns:
+                if clean_x_col not in store or clean_y_col not in store or clean_throttle_col not in store:
                     messagebox.showerror("Error", "Selected channels not found in dataset.")
                     return
 
                 # Extract the selected data
-                x_data = pd.to_numeric(df[clean_x_col], errors='coerce').dropna()
-                y_data = pd.to_numeric(df[clean_y_col], errors='coerce').dropna()
-                throttle_data = pd.to_numeric(df[clean_throttle_col], errors='coerce').dropna()
+                x_data = store.numeric(clean_x_col)
+                y_data = store.numeric(clean_y_col)
+                throttle_data = store.numeric(clean_throttle_col)
 
                 if len(x_data) == 0 or len(y_data) == 0 or len(throttle_data) == 0:
                     messagebox.showerror("Error", "Selected channels contain no valid data.")
@@ -316,6 +322,7 @@ def plot_track_report(app):
 
                 # Clear the existing plot in the selected plot area
                 ax.clear()
+                app.plot_model.clear_area(plot_area_index)
 
                 # Plot the track with throttle as the colormap
                 scatter = ax.scatter(x_data, y_data, c=throttle_data, cmap=colormap, norm=norm, label=f"Throttle: {clean_throttle_col}")
@@ -338,7 +345,7 @@ def plot_track_report(app):
                     ax.tick_params(colors='black')  # Set the color of the ticks and tick labels to black
 
                 # Add colorbar for throttle
-                cbar = plt.colorbar(scatter, ax=ax)
+                cbar = ax.figure.colorbar(scatter, ax=ax)
                 cbar.set_label(clean_throttle_col)
                 if app.current_theme == 'black':
                     cbar.ax.yaxis.set_tick_params(color='white')  # Change the color of the colorbar tick marks
@@ -369,20 +376,20 @@ def plot_3d_data(app, dataset_name, x_col, y_col, z_col):
     try:
         # Find the index of the selected dataset
         dataset_index = app.dataset_names.index(dataset_name)
-        df = app.dataframes[dataset_index]
+        store = app.channel_stores[dataset_index]
 
-        # Ensure that the selected columns exist in the DataFrame
-        if x_col not in df.columns or y_col not in df.columns or z_col not in df.columns:
+        # Ensure that the selected columns exist in the dataset
+        if x_col not in store or y_col not in store or z_col not in store:
             messagebox.showerror("Error", "Selected channels not found in the dataset.")
             return
 
-        # Convert the selected columns to numeric, forcing non-numeric values to NaN
-        x_data = pd.to_numeric(df[x_col], errors='coerce').dropna()
-        y_data = pd.to_numeric(df[y_col], errors='coerce').dropna()
-        z_data = pd.to_numeric(df[z_col], errors='coerce').dropna()
+        # Read the numeric samples of the selected columns (non-numeric values are dropped)
+        x_data = store.numeric(x_col)
+        y_data = store.numeric(y_col)
+        z_data = store.numeric(z_col)
 
         # Check if there's any invalid (non-numeric) data in the columns
-        if x_data.empty or y_data.empty or z_data.empty:
+        if x_data.size == 0 or y_data.size == 0 or z_data.size == 0:
             messagebox.showerror("Error", "Selected channels contain no valid numeric data.")
             return
 
@@ -394,8 +401,10 @@ def plot_3d_data(app, dataset_name, x_col, y_col, z_col):
         plot_window = tk.Toplevel(app.root)
         plot_window.title("3D Plot Viewer")
 
-        # Create a new figure and 3D axis
-        fig = plt.figure(figsize=(8, 6))
+        # Create a new figure owned by this window; it is released when the window closes
+        figure_key = f"3d-{id(plot_window)}"
+        fig = app.figures.new_figure(figure_key, figsize=(8, 6))
+        app.figures.bind_to_window(figure_key, plot_window)
         ax = fig.add_subplot(111, projection='3d')
 
         # Plot the 3D scatter plot with colormap
@@ -408,7 +417,7 @@ def plot_3d_data(app, dataset_name, x_col, y_col, z_col):
         ax.set_title(f"3D Scatter Plot of {z_col} vs {y_col} vs {x_col}")
 
         # Add color bar for the colormap
-        cbar = plt.colorbar(scatter, ax=ax)
+        cbar = fig.colorbar(scatter, ax=ax)
         cbar.set_label(z_col)
 
         # Embed the plot in the new window using FigureCanvasTkAgg
@@ -418,6 +427,7 @@ def plot_3d_data(app, dataset_name, x_col, y_col, z_col):
         # Add the navigation toolbar to the window
         toolbar = NavigationToolbar2Tk(canvas, plot_window)
         toolbar.update()
+        app.figures.attach(figure_key, canvas, toolbar)
 
         # Redraw the canvas
         canvas.draw()
@@ -484,10 +494,10 @@ def plot_scatter_data(app):
 
             if dataset_name and x_col and y_col and plot_area:
                 dataset_index = app.dataset_names.index(dataset_name)
-                df = app.dataframes[dataset_index]
+                store = app.channel_stores[dataset_index]
 
                 print(f"Dataset index: {dataset_index}")
-                print(f"Available columns in dataset: {df.columns.tolist()}")
+                print(f"Available columns in dataset: {store.columns.tolist()}")
 
                 # Use cleaned column names without the dataset index
                 clean_x_col = x_col.split('##')[0]
@@ -496,14 +506,14 @@ def plot_scatter_data(app):
                 print(f"Clean X channel: {clean_x_col}")
                 print(f"Clean Y channel: {clean_y_col}")
 
-                if clean_x_col not in df.columns or clean_y_col not in df.columns:
+                if clean_x_col not in store or clean_y_col not in store:
                     messagebox.showerror("Error", f"Selected channels not found in dataset: {x_col}, {y_col}")
-                    print(f"X channel {clean_x_col} or Y channel {clean_y_col} not found in dataframe columns: {df.columns.tolist()}")
+                    print(f"X channel {clean_x_col} or Y channel {clean_y_col} not found in dataset columns: {store.columns.tolist()}")
                     return
 
                 # Extract the selected data
-                x_data = pd.to_numeric(df[clean_x_col], errors='coerce').dropna()
-                y_data = pd.to_numeric(df[clean_y_col], errors='coerce').dropna()
+                x_data = store.numeric(clean_x_col)
+                y_data = store.numeric(clean_y_col)
 
                 print(f"X data length: {len(x_data)}, Y data length: {len(y_data)}")
 
@@ -573,8 +583,11 @@ def plot_histogram_data(app):
             dataset_index = app.dataset_names.index(selected_dataset)
             channels = app.channel_names[dataset_index]
             # Update all tire damper speed comboboxes with the channel names
-            for tire, damper_menu in damper_menus.items():
+            for corner, (tire, damper_menu) in zip(CORNERS, damper_menus.items()):
                 damper_menu['values'] = [ch.split('##')[0] for ch in channels]  # Strip dataset index
+                # Preselect the speeds derived from damper positions ('Math' > 'Add Damper Speeds')
+                if f"Damper Speed {corner}" in damper_menu['values']:
+                    tire_dampers[tire].set(f"Damper Speed {corner}")
 
     dataset_menu.bind("<<ComboboxSelected>>", update_channels)
 
@@ -583,18 +596,21 @@ def plot_histogram_data(app):
             dataset_name = dataset_var.get()
             if dataset_name:
                 dataset_index = app.dataset_names.index(dataset_name)
-                df = app.dataframes[dataset_index]
+                store = app.channel_stores[dataset_index]
 
                 # Prepare the plot in a 2x2 layout
                 if not hasattr(app, 'histogram_tab') or not app.histogram_tab.winfo_exists():
                     app.histogram_tab = tk.Toplevel(app.root)
                     app.histogram_tab.title("Histogram Plot - 4 Tires (2x2)")
 
-                    app.histogram_fig, app.histogram_axes = plt.subplots(2, 2, figsize=(12, 8))
+                    app.histogram_fig = app.figures.new_figure('histogram', figsize=(12, 8))
+                    app.histogram_axes = app.histogram_fig.subplots(2, 2)
+                    app.figures.bind_to_window('histogram', app.histogram_tab)
                     app.histogram_canvas = FigureCanvasTkAgg(app.histogram_fig, app.histogram_tab)
                     app.histogram_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
                     app.histogram_toolbar = NavigationToolbar2Tk(app.histogram_canvas, app.histogram_tab)
                     app.histogram_toolbar.pack(side=tk.TOP, fill=tk.X)
+                    app.figures.attach('histogram', app.histogram_canvas, app.histogram_toolbar)
                     app.histogram_canvas.draw()
 
                 # Get the selected channels and plot them in the 2x2 grid
@@ -605,12 +621,12 @@ def plot_histogram_data(app):
                     # Use cleaned channel names for titles and legends
                     clean_damper_channel = damper_channel.split('##')[0] if damper_channel else None
 
-                    if clean_damper_channel not in df.columns:
+                    if clean_damper_channel not in store:
                         messagebox.showerror("Error", f"Invalid channel: {damper_channel}")
                         return
 
                     # Extract data for histogram plotting
-                    damper_data = pd.to_numeric(df[clean_damper_channel], errors='coerce').dropna()
+                    damper_data = store.numeric(clean_damper_channel)
 
                     # Plot the histogram for the selected damper channel
                     ax.clear()
@@ -625,7 +641,7 @@ def plot_histogram_data(app):
                     ax.xaxis.set_major_locator(MaxNLocator(nbins=10))  # Limit the number of x-axis ticks
 
                 # Call tight_layout to ensure no overlap between subplots
-                plt.tight_layout()
+                app.histogram_fig.tight_layout()
 
                 # Redraw the canvas
                 app.histogram_canvas.draw()
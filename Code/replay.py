@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import socket
+import time
+import numpy as np
+
+from data_files import detect_time_channel, read_data_file
+from ld_reader import is_ld_file
+from live_stream import DEFAULT_PORT, pack_data, row_dtype
+from motec_converter import DEFAULT_FRAME_LAYOUT, MoTeCParser, load_frame_layout
+
+# Replay speeds offered in the UI and on the command line; None replays as fast as the plots draw
+REPLAY_SPEEDS = {'1x': 1.0, '10x': 10.0, 'max': None}
+MAX_SPEED_ROWS = 10_000  # Rows handed out per frame at max speed
+CAN_FRAME_RATE = 50.0  # Frames per second assumed for MoTeC CAN logs, which carry no time stamps
+MAX_DATAGRAM_BYTES = 60_000  # Keeps every UDP datagram below the 64 kB limit
+
+
+class ReplaySource:
+    """Plays recorded channels back as a live source, paced by their time channel.
+
+    It has the same drain() interface as UdpSource, so a LivePlotter draws a replay exactly
+    like a live stream. Samples are handed out when they become due on the wall clock.
+    """
+
+    def __init__(self, columns, time_channel, speed=1.0, loop=False):
+        time_values = np.asarray(columns[time_channel], dtype=np.float64)
+        keep = ~np.isnan(time_values)  # Rows without a time stamp cannot be paced
+
+        self.time_channel = time_channel
+        self.channels = [time_channel] + [channel for channel in columns if channel != time_channel]
+        self.columns = {channel: np.asarray(columns[channel], dtype=np.float64)[keep] for channel in self.channels}
+        # Pace by the time channel relative to its first sample; lap resets never move the replay backwards
+        self.offsets = np.maximum.accumulate(self.columns[time_channel] - self.columns[time_channel][0]) if keep.any() else np.zeros(0)
+        self.speed = speed
+        self.loop = loop
+        self.position = 0  # Next row to hand out
+        self.started = None
+        self.schema_sent = False
+
+    @property
+    def rows(self):
+        return len(self.offsets)
+
+    @property
+    def finished(self):
+        return self.position >= self.rows and not self.loop
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.position = 0
+        self.schema_sent = False
+        print(f"Replaying {self.rows} rows of {len(self.channels) - 1} channels at {self.describe_speed()}")
+
+    def due_rows(self, now):
+        """Return the row index up to which samples are due at the wall clock time now."""
+        if self.speed is None:
+            return min(self.position + MAX_SPEED_ROWS, self.rows)
+        return int(np.searchsorted(self.offsets, (now - self.started) * self.speed, side='right'))
+
+    def due_time(self, row):
+        """Return the wall clock time at which row became due."""
+        return self.started + self.offsets[row] / self.speed
+
+    def drain(self):
+        """Return the schema and the samples that became due since the last call."""
+        items = []
+        if not self.schema_sent:
+            items.append(('schema', self.channels))
+            self.schema_sent = True
+
+        now = time.perf_counter()
+        if self.loop and self.position >= self.rows and self.rows:
+            # Start over; the replayed time keeps increasing so the live X axis stays monotonic
+            self.started = now
+            self.position = 0
+            self.columns[self.time_channel] = self.columns[self.time_channel] + self.offsets[-1] + self.frame_period()
+
+        end = self.due_rows(now)
+        if end > self.position:
+            block = np.column_stack([self.columns[channel][self.position:end] for channel in self.channels])
+            # Latency is measured from the moment the oldest sample of the block was due
+            due = now if self.speed is None else self.due_time(self.position)
+            items.append(('data', due, block))
+            self.position = end
+        return items
+
+    def frame_period(self):
+        """Return the typical sample spacing of the time channel."""
+        return float(np.median(np.diff(self.offsets))) if self.rows > 1 else 0.0
+
+    def stop(self):
+        pass  # Nothing runs in the background
+
+    def describe_speed(self):
+        return "max speed" if self.speed is None else f"{self.speed:g}x speed"
+
+    def describe(self):
+        state = "finished" if self.finished else "running"
+        return f"{self.position} of {self.rows} rows replayed at {self.describe_speed()} ({state})"
+
+
+def dataset_columns(channel_store, time_channel, bindings=None, n_areas=1):
+    """Return the time channel and the channels a replay of an imported dataset sends.
+
+    With bindings (channel names per plot area) only the bound channels are sent; without, the
+    first n_areas channels that hold numbers, one per plot area like the live plots bind them.
+    Only these channels are coerced, so a lazily imported dataset reads nothing else.
+    Channels without any number are left out.
+    """
+    bound = [channel for area in bindings for channel in area] if bindings else list(channel_store.columns)
+    columns = {}
+    for channel in [time_channel] + bound:
+        if not bindings and len(columns) > n_areas:
+            break
+        if channel in columns or channel not in channel_store:
+            continue
+        values, valid = channel_store.coerce(channel)
+        if valid.any():
+            columns[channel] = values
+    return columns
+
+
+def read_can_log(file_path, layout=DEFAULT_FRAME_LAYOUT, frame_rate=CAN_FRAME_RATE):
+    """Decode a MoTeC CAN frame log and add a Time channel at frame_rate."""
+    parser = MoTeCParser(file_path, layout)
+    windows = list(parser.iter_columns())
+    columns = {channel: np.concatenate([window[channel] for window in windows]) if windows else np.zeros(0)
+               for channel in parser.layout.channels}
+    n_frames = len(next(iter(columns.values()), []))
+    return {"Time": np.arange(n_frames) / frame_rate, **columns}
+
+
+def read_replay_file(file_path, layout=DEFAULT_FRAME_LAYOUT, frame_rate=CAN_FRAME_RATE):
+    """Read a data file into (columns, time channel) for a replay.
+
+    Files the importer understands are read like an import; anything else is decoded as a
+    MoTeC CAN frame log.
+    """
+    if file_path.endswith(('.csv', '.xlsx', '.TXT')) or (file_path.endswith('.ld') and is_ld_file(file_path)):
+        df = read_data_file(file_path)
+        columns = {channel: df[channel].to_numpy(dtype=np.float64, na_value=np.nan)
+                   for channel in df.columns if df[channel].dtype.kind in 'biuf'}
+        return columns, detect_time_channel(columns)
+    return read_can_log(file_path, layout, frame_rate), "Time"
+
+
+def send_replay(source, port=DEFAULT_PORT, host='127.0.0.1'):
+    """Send a replay over UDP to a running live stream and return the rows sent per second."""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rows_per_packet = max(MAX_DATAGRAM_BYTES // row_dtype(len(source.channels)).itemsize, 1)
+    schema = json.dumps({"channels": source.channels}).encode()
+
+    sequence = 0
+    source.start()
+    next_schema = source.started
+    while not source.finished:
+        now = time.perf_counter()
+        if now >= next_schema:
+            sender.sendto(schema, (host, port))  # Repeated so a late receiver can still start
+            next_schema = now + 1.0
+
+        for item in source.drain():
+            if item[0] != 'data':
+                continue
+            block = item[2]
+            for first in range(0, len(block), rows_per_packet):
+                sender.sendto(pack_data(sequence, block[first:first + rows_per_packet]), (host, port))
+                sequence = (sequence + 1) % 2 ** 32
+        if source.speed is not None:
+            time.sleep(0.001)
+
+    duration = max(time.perf_counter() - source.started, 1e-9)
+    return source.rows / duration
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Replay a recorded log to the OpenRacePlot live mode over UDP.")
+    argument_parser.add_argument("input_file", help="CSV, TXT, XLSX or MoTeC i2 .ld file, or a MoTeC CAN frame log")
+    argument_parser.add_argument("--speed", choices=list(REPLAY_SPEEDS), default='1x')
+    argument_parser.add_argument("--host", default='127.0.0.1')
+    argument_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    argument_parser.add_argument("--layout", help="JSON frame layout for MoTeC CAN logs")
+    argument_parser.add_argument("--loop", action='store_true', help="Start over at the end of the log until interrupted")
+    argument_parser.add_argument("--frame-rate", type=float, default=CAN_FRAME_RATE, help="Frames per second of a MoTeC CAN log")
+    args = argument_parser.parse_args()
+
+    layout = load_frame_layout(args.layout) if args.layout else DEFAULT_FRAME_LAYOUT
+    columns, time_channel = read_replay_file(args.input_file, layout, args.frame_rate)
+    if time_channel is None:
+        argument_parser.error(f"No time channel found in {os.path.basename(args.input_file)}")
+
+    replay_source = ReplaySource(columns, time_channel, REPLAY_SPEEDS[args.speed], args.loop)
+    rate = send_replay(replay_source, args.port, args.host)
+    print(f"Replay finished: {replay_source.describe()}, {rate:.0f} rows/s sent")
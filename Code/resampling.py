@@ -0,0 +1,131 @@
+import numpy as np
+
+# Default spacing of the common grids (distance channel units and seconds)
+DEFAULT_GRID_STEPS = {'distance': 1.0, 'time': 0.01}
+
+
+class Grid:
+    """A shared, evenly spaced distance or time axis starting at zero.
+
+    Every channel resampled onto the grid uses a prefix of the same points array, so any
+    number of overlaid lines share one X array and can be compared point by point.
+    """
+
+    def __init__(self, kind, step):
+        self.kind = kind
+        self.step = step
+        self.points = np.zeros(0)
+
+    @property
+    def key(self):
+        return (self.kind, self.step)
+
+    def size_for(self, length):
+        """Return the number of grid points that cover [0, length]."""
+        return int(np.floor(length / self.step + 1e-9)) + 1 if length >= 0 else 0
+
+    def values(self, n):
+        """Return the first n grid points (a view of the shared points array)."""
+        if n > len(self.points):
+            # Leave room for longer laps of the same track; lines drawn earlier keep the view of the previous array
+            self.points = np.arange(max(2 * n, 2 * len(self.points))) * self.step
+        return self.points[:n]
+
+
+def unwrap_resets(x):
+    """Make a distance that resets every lap cumulative by adding the length of each finished lap."""
+    steps = np.diff(x)
+    if not len(steps) or not (steps < -0.5 * np.max(np.abs(x))).any():
+        return x
+    resets = np.where(steps < -0.5 * np.max(np.abs(x)), -steps, 0.0)
+    return x + np.concatenate([[0.0], np.cumsum(resets)])
+
+
+class ResamplingService:
+    """Maps channels onto shared distance/time grids, memoized per (dataset, channel, grid).
+
+    The X axis of a segment (whole session or lap) is made relative to its first sample,
+    cumulative across distance resets and strictly increasing, so every channel has exactly
+    one value per grid point. Integer channels (gear, flags) are held instead of interpolated.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = dict(DEFAULT_GRID_STEPS, **(steps or {}))
+        self.grids = {}  # (kind, step) -> Grid
+        self.axes = {}  # (dataset, x channel, segment) -> (increasing x, sample indices)
+        self.results = {}  # (dataset, channel, x channel, segment, grid key) -> values on the grid
+        self.hits = self.misses = 0
+
+    def grid(self, kind, step=None):
+        step = step or self.steps[kind]
+        if (kind, step) not in self.grids:
+            self.grids[(kind, step)] = Grid(kind, step)
+        return self.grids[(kind, step)]
+
+    def source_axis(self, dataset, store, x_channel, segment=None):
+        """Return (x, indices) of a segment: x strictly increasing from zero at the sample indices."""
+        key = (dataset, x_channel, segment)
+        if key not in self.axes:
+            segment_slice = slice(*segment) if segment is not None else slice(None)
+            x_values, x_valid = store.coerce(x_channel)
+            indices = np.arange(len(x_values))[segment_slice][x_valid[segment_slice]]
+            x = x_values[indices].astype(np.float64)
+            if len(x):
+                # Relative to the segment start, and never backwards (logging noise is held)
+                x = np.maximum.accumulate(unwrap_resets(x) - x[0])
+                first = np.flatnonzero(np.diff(x, prepend=-1.0) > 0)  # First sample at each new X
+                x, indices = x[first], indices[first]
+            self.axes[key] = (x, indices)
+        return self.axes[key]
+
+    def resample(self, dataset, store, channel, x_channel, kind, step=None, segment=None):
+        """Return (grid points, channel values) of channel over x_channel on the shared grid.
+
+        dataset is a stable key of the store (its name); segment is an optional (start, stop)
+        sample range such as a lap.
+        """
+        grid = self.grid(kind, step)
+        key = (dataset, channel, x_channel, segment, grid.key)
+        if key in self.results:
+            self.hits += 1
+            values = self.results[key]
+            return grid.values(len(values)), values
+
+        self.misses += 1
+        x, indices = self.source_axis(dataset, store, x_channel, segment)
+        y_values, y_valid = store.coerce(channel)
+        keep = y_valid[indices]
+        x, y = x[keep], y_values[indices[keep]]
+
+        points = grid.values(grid.size_for(x[-1]) if len(x) else 0)
+        if not len(x):
+            values = np.zeros(0)
+        elif store.is_integer(channel):
+            # Hold the last sample, a gear or flag channel has no values in between
+            values = y[np.maximum(np.searchsorted(x, points, side='right') - 1, 0)]
+        else:
+            values = np.interp(points, x, y).astype(y.dtype, copy=False)  # float32 channels stay compact
+        self.results[key] = values
+        return points, values
+
+    def invalidate(self, dataset=None, channels=None):
+        """Forget the results of one dataset (or all), e.g. after its laps were split again.
+
+        With channels, only the results that read one of them (as channel or X channel) are dropped.
+        """
+        if dataset is None:
+            self.axes.clear()
+            self.results.clear()
+            return
+
+        def stale(key, channel_keys):
+            return key[0] == dataset and (channels is None or any(key[i] in channels for i in channel_keys))
+
+        self.axes = {key: value for key, value in self.axes.items() if not stale(key, (1,))}
+        self.results = {key: value for key, value in self.results.items() if not stale(key, (1, 2))}
+
+    def stats(self):
+        """Return the number of memoized arrays, their size in bytes and the hit/miss counts."""
+        arrays = list(self.results.values()) + [array for axis in self.axes.values() for array in axis]
+        return {'arrays': len(arrays), 'bytes': sum(array.nbytes for array in arrays),
+                'hits': self.hits, 'misses': self.misses}
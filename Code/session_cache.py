@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Bump when the parsers change so stale columns are never served
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get("OPENRACEPLOT_CACHE", os.path.join(os.path.expanduser("~"), ".openraceplot", "cache"))
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+INDEX_FILE = "index.json"
+
+# Column files written incrementally start with a fixed-size .npy header that is patched at the end
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+NPY_HEADER_SIZE = 128
+MANIFEST_FILE = "manifest.json"
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's content (plus the cache version)."""
+    digest = hashlib.sha256(f"OpenRacePlot cache v{CACHE_VERSION}".encode())
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SessionCache:
+    """Content-hash keyed cache of imported datasets, stored as one .npy file per channel.
+
+    The first import of a file writes its columns; later imports of the same content
+    memory-map them instead of parsing the source again. Entries are evicted least
+    recently used first once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _read_index(self):
+        """Read the source path -> (mtime, size, hash) index."""
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = os.path.join(self.cache_dir, f"{INDEX_FILE}.{uuid.uuid4().hex}")
+        with open(temp_path, 'w') as file:
+            json.dump(index, file)
+        os.replace(temp_path, os.path.join(self.cache_dir, INDEX_FILE))
+
+    def known_key(self, file_path):
+        """Return the content hash of file_path if the index has it for the current mtime and size, else None.
+
+        Never reads the file, so it is cheap enough for the Tk thread.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        entry = self._read_index().get(os.path.abspath(file_path))
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return entry["hash"]
+        return None
+
+    def key_for(self, file_path):
+        """Return the content hash of file_path, re-hashing only when its mtime or size changed."""
+        known_key = self.known_key(file_path)
+        if known_key:
+            return known_key
+
+        # New file, or the file changed on disk: hash the content again
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        content_hash = hash_file(file_path)
+        index = self._read_index()  # Read after hashing, other workers may have added files meanwhile
+        index[file_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": content_hash}
+        try:
+            self._write_index(index)
+        except OSError as e:
+            print(f"Could not update the session cache index: {e}")
+        return content_hash
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def contains(self, file_path, key=None):
+        """Return True if a complete cache entry exists for the current content of file_path (or for key)."""
+        try:
+            return os.path.exists(os.path.join(self.entry_dir(key or self.key_for(file_path)), MANIFEST_FILE))
+        except OSError:
+            return False
+
+    def load(self, file_path, key=None):
+        """Return the cached dataset of file_path as a DataFrame of memory-mapped columns, or None.
+
+        key is the content hash when the caller already knows it, so the file is not read again.
+        """
+        try:
+            key = key or self.key_for(file_path)
+            manifest_path = os.path.join(self.entry_dir(key), MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                return None
+
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+
+            columns = {}
+            for column in manifest["columns"]:
+                values = np.load(os.path.join(self.entry_dir(key), column["file"]), mmap_mode='r')
+                if "categories" in column:
+                    # Category columns are stored as their codes
+                    values = pd.Categorical.from_codes(values, categories=column["categories"])
+                columns[column["name"]] = values
+
+            os.utime(manifest_path)  # Mark the entry as recently used
+            print(f"Loaded {file_path} from the session cache ({len(columns)} channels)")
+            return pd.DataFrame(columns, copy=False)
+
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Session cache miss for {file_path}: {e}")
+            return None
+
+    def store(self, file_path, df, key=None):
+        """Write every column of df to the cache entry of file_path (or key) and evict old entries."""
+        try:
+            key = key or self.key_for(file_path)
+            final_dir = self.entry_dir(key)
+            if os.path.exists(os.path.join(final_dir, MANIFEST_FILE)):
+                return
+
+            # Write into a temporary directory first so a half-written entry is never loaded
+            temp_dir = os.path.join(self.cache_dir, f"tmp-{uuid.uuid4().hex}")
+            os.makedirs(temp_dir)
+
+            manifest = {"source": os.path.abspath(file_path), "rows": len(df), "columns": []}
+            for i, name in enumerate(df.columns):
+                file_name = f"col_{i:05d}.npy"
+                np.save(os.path.join(temp_dir, file_name), column_array(df[name]))
+                column = {"name": str(name), "file": file_name}
+                if isinstance(df[name].dtype, pd.CategoricalDtype):
+                    column["categories"] = [str(category) for category in df[name].cat.categories]
+                manifest["columns"].append(column)
+
+            self.commit(key, temp_dir, manifest)
+            print(f"Stored {file_path} in the session cache ({len(df.columns)} channels)")
+
+        except OSError as e:
+            print(f"Could not write {file_path} to the session cache: {e}")
+
+    def commit(self, key, temp_dir, manifest):
+        """Write the manifest of a fully written temporary entry and move it into place."""
+        with open(os.path.join(temp_dir, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file)
+
+        final_dir = self.entry_dir(key)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(temp_dir, final_dir)
+        self.evict(keep=key)
+
+    def writer(self, file_path):
+        """Return a CacheEntryWriter that builds the entry of file_path column chunk by column chunk."""
+        return CacheEntryWriter(self, file_path)
+
+    def entries(self):
+        """Return (last used time, size in bytes, key) for every complete cache entry."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for key in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, key, MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(self.cache_dir, key)))
+            entries.append((os.path.getmtime(manifest_path), size, key))
+        return entries
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        for last_used, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            total -= size
+            print(f"Evicted session cache entry {key} (last used {time.ctime(last_used)})")
+
+
+class CacheEntryWriter:
+    """Writes one cache entry incrementally, so a dataset never has to be in memory as a whole.
+
+    Each column is a .npy file whose header reserves room for any row count; the header
+    is patched with the final shape when the entry is closed.
+    """
+
+    def __init__(self, cache, file_path):
+        self.cache = cache
+        self.file_path = file_path
+        self.key = cache.key_for(file_path)
+        self.temp_dir = os.path.join(cache.cache_dir, f"tmp-{uuid.uuid4().hex}")
+        os.makedirs(self.temp_dir)
+        self.columns = {}  # Column name -> [open file, dtype, rows written, file name]
+
+    def append(self, columns):
+        """Append one chunk of samples (column name -> 1-D array) to the entry."""
+        for name, values in columns.items():
+            if name not in self.columns:
+                file_name = f"col_{len(self.columns):05d}.npy"
+                file = open(os.path.join(self.temp_dir, file_name), 'wb')
+                dtype = np.asarray(values).dtype
+                file.write(npy_header(dtype, 0))
+                self.columns[name] = [file, dtype, 0, file_name]
+
+            column = self.columns[name]
+            values = np.ascontiguousarray(values, dtype=column[1])
+            values.tofile(column[0])
+            column[2] += len(values)
+
+    def close(self):
+        """Patch the column headers and move the finished entry into the cache."""
+        manifest = {"source": os.path.abspath(self.file_path), "rows": 0, "columns": []}
+        for name, (file, dtype, rows, file_name) in self.columns.items():
+            file.seek(0)
+            file.write(npy_header(dtype, rows))
+            file.close()
+            manifest["rows"] = max(manifest["rows"], rows)
+            manifest["columns"].append({"name": str(name), "file": file_name})
+
+        self.cache.commit(self.key, self.temp_dir, manifest)
+        print(f"Stored {self.file_path} in the session cache ({len(self.columns)} channels, {manifest['rows']} rows)")
+
+    def abort(self):
+        for file, _, _, _ in self.columns.values():
+            file.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def npy_header(dtype, rows):
+    """Return a fixed-size .npy (version 1.0) header for a 1-D array of rows samples."""
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (rows,)})
+    padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(header) - 1
+    return NPY_MAGIC + (NPY_HEADER_SIZE - len(NPY_MAGIC) - 2).to_bytes(2, 'little') + (header + ' ' * padding + '\n').encode('latin-1')
+
+
+def column_array(series):
+    """Return a column as a typed NumPy array that np.save can write without pickling."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return np.ascontiguousarray(series.cat.codes.to_numpy())
+    values = series.to_numpy()
+    if values.dtype.kind in 'biufcmM':
+        return np.ascontiguousarray(values)
+    # Text and mixed columns are stored as fixed-width unicode
+    return series.astype(str).to_numpy().astype(str)
+
+
+session_cache = SessionCache()
@@ -0,0 +1,182 @@
+import numpy as np
+
+# Derived channels are computed this many samples at a time, so a 10-million-sample channel
+# never needs more than a few chunk-sized temporaries
+CHUNK_SAMPLES = 1 << 20
+
+DAMPER_POSITION_KEYWORDS = ["susp pos", "damper pos", "shock pos"]
+CORNERS = ["FL", "FR", "RL", "RR"]
+
+
+def sample_rate(time):
+    """Return the sample rate (Hz) of a time channel from its median sample interval."""
+    steps = np.diff(time[:CHUNK_SAMPLES])
+    steps = steps[np.isfinite(steps) & (steps > 0)]
+    if not len(steps):
+        raise ValueError("The time channel does not increase")
+    return 1.0 / float(np.median(steps))
+
+
+def window_samples(seconds, rate, minimum=1):
+    """Return the odd number of samples (at least minimum) covering a window of seconds."""
+    samples = max(int(round(seconds * rate)), minimum)
+    return samples if samples % 2 else samples + 1
+
+
+def stream(values, half, function, chunk=CHUNK_SAMPLES):
+    """Apply a windowed operation chunk by chunk and return the full-length result.
+
+    function receives a segment with half extra samples on each side and must return the
+    len(segment) - 2 * half samples in between. The session ends are extended by odd
+    reflection (mirrored about the end value), which keeps both the level and the slope.
+    """
+    n = len(values)
+    out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+    if n == 1:
+        return function(np.full(2 * half + 1, values[0], dtype=np.float64))
+
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        segment = values[max(start - half, 0):min(stop + half, n)].astype(np.float64)
+        head = half - (start - max(start - half, 0))
+        tail = half - (min(stop + half, n) - stop)
+        if head or tail:
+            segment = np.concatenate([odd_reflection(values, head, at_end=False), segment,
+                                      odd_reflection(values, tail, at_end=True)])
+        out[start:stop] = function(segment)
+    return out
+
+
+def odd_reflection(values, count, at_end):
+    """Return count samples mirrored about the first (or last) value of values, for padding."""
+    if not count:
+        return np.zeros(0)
+    if at_end:
+        mirrored = values[-2:-count - 2:-1] if count < len(values) else values[-2::-1]
+        mirrored = np.pad(mirrored.astype(np.float64), (0, count - len(mirrored)), mode='edge')
+        return 2.0 * values[-1] - mirrored
+    mirrored = values[count:0:-1] if count < len(values) else values[:0:-1]
+    mirrored = np.pad(mirrored.astype(np.float64), (count - len(mirrored), 0), mode='edge')
+    return 2.0 * values[0] - mirrored
+
+
+def savgol_coefficients(window, polyorder, deriv=0, delta=1.0):
+    """Return the Savitzky-Golay weights of a centered window (a local polynomial least squares fit).
+
+    Correlating the samples with the weights gives the deriv-th derivative of the fitted
+    polynomial at the window center, for samples delta apart.
+    """
+    if window % 2 == 0 or window <= polyorder:
+        raise ValueError("The Savitzky-Golay window must be odd and longer than the polynomial order")
+    offsets = np.arange(window) - window // 2
+    vandermonde = offsets[:, None] ** np.arange(polyorder + 1)
+    # Row deriv of the pseudo-inverse maps the window to the deriv-th polynomial coefficient
+    coefficients = np.linalg.pinv(vandermonde)[deriv]
+    return coefficients * np.prod(np.arange(1, deriv + 1)) / delta ** deriv
+
+
+def savgol_filter(values, window, polyorder, deriv=0, delta=1.0):
+    """Smooth (or differentiate) uniformly sampled values with a Savitzky-Golay filter."""
+    weights = savgol_coefficients(window, polyorder, deriv, delta)
+    return stream(values, window // 2, lambda segment: np.correlate(segment, weights, mode='valid'))
+
+
+def derivative(time, values):
+    """Rate of change of a channel per second (central differences, no smoothing)."""
+    return np.gradient(values, time)
+
+
+def sg_derivative(time, values, window_seconds=0.05, polyorder=2):
+    """Rate of change per second of a noisy channel, e.g. damper speed from damper position.
+
+    A Savitzky-Golay fit over window_seconds smooths the noise that plain differences amplify.
+    """
+    rate = sample_rate(time)
+    window = window_samples(window_seconds, rate, minimum=polyorder + 2)
+    return savgol_filter(values, window, int(polyorder), deriv=1, delta=1.0 / rate)
+
+
+def moving_average(time, values, window_seconds):
+    """Centered moving average of a channel over window_seconds."""
+    window = window_samples(window_seconds, sample_rate(time))
+    half = window // 2
+
+    def average(segment):
+        sums = np.cumsum(np.concatenate([[0.0], segment]))
+        return (sums[window:] - sums[:-window]) / window
+
+    return stream(values, half, average)
+
+
+def lowpass(time, values, cutoff_hz, order=2):
+    """Zero-phase Butterworth low-pass filter of a channel (the response of a forward-backward pass).
+
+    The filter is applied in the frequency domain with the squared gain of the digital
+    Butterworth design, chunk by chunk with enough overlap for its impulse response to die out.
+    """
+    rate = sample_rate(time)
+    if not 0 < cutoff_hz < rate / 2:
+        raise ValueError(f"The cutoff must be between 0 and {rate / 2:g} Hz (half the sample rate)")
+    warped_cutoff = np.tan(np.pi * cutoff_hz / rate)  # Bilinear transform prewarping
+    half = int(np.ceil(4 * order * rate / cutoff_hz))  # The impulse response lasts a few cutoff periods
+
+    # Chunks plus their overlap fill a power-of-two FFT exactly (the last one is zero padded)
+    size = 1 << int(np.ceil(np.log2(max(CHUNK_SAMPLES, 4 * half))))
+    frequencies = np.fft.rfftfreq(size, d=1.0 / rate)
+    gain = 1.0 / (1.0 + (np.tan(np.pi * np.minimum(frequencies / rate, 0.4999)) / warped_cutoff) ** (2 * order))
+
+    def filter_segment(segment):
+        # The circular wrap of the padding only reaches into the overlap, which is dropped
+        filtered = np.fft.irfft(np.fft.rfft(segment, size) * gain, size)
+        return filtered[half:len(segment) - half]
+
+    return stream(values, half, filter_segment, chunk=size - 2 * half)
+
+
+def integral(time, values):
+    """Running integral of a channel over time (trapezoids; gaps add nothing), chunk by chunk."""
+    n = len(values)
+    out = np.empty(n, dtype=np.float64)
+    total = 0.0
+    for start in range(0, n, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, n)
+        begin = max(start - 1, 0)  # The trapezoid across the chunk boundary belongs to this chunk
+        chunk = values[begin:stop].astype(np.float64)  # float32 channels would lose the running total
+        steps = (chunk[1:] + chunk[:-1]) / 2 * np.diff(time[begin:stop].astype(np.float64))
+        running = total + np.nancumsum(steps)
+        if start == 0:
+            out[0] = 0.0
+            out[1:stop] = running
+        else:
+            out[start:stop] = running
+        total = running[-1] if len(running) else total
+    return out
+
+
+def resample(time, values, rate):
+    """Return a channel as if it had been logged at rate Hz, interpolated back onto its time base.
+
+    Resampling a channel logged at a low rate (a stepped lap distance) at that rate turns
+    its steps into a smooth ramp; a lower rate gives a coarser, smoothed channel.
+    """
+    valid = np.isfinite(time) & np.isfinite(values)
+    if valid.sum() < 2:
+        return np.full(len(values), np.nan)
+    time_valid, values_valid = time[valid], values[valid]
+    grid = np.arange(time_valid[0], time_valid[-1], 1.0 / rate)
+    return np.interp(time, grid, np.interp(grid, time_valid, values_valid))
+
+
+def damper_position_channels(columns):
+    """Return the damper (suspension) position channels of a dataset."""
+    return [channel for channel in columns if any(keyword in channel.lower() for keyword in DAMPER_POSITION_KEYWORDS)]
+
+
+def damper_speed_name(position_channel):
+    """Return the name of the damper speed math channel of a damper position channel."""
+    for corner in CORNERS:
+        if position_channel.upper().endswith(corner):
+            return f"Damper Speed {corner}"
+    return f"{position_channel} Speed"
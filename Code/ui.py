@@ -5,13 +5,27 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.gridspec import GridSpec
 from matplotlib.ticker import MaxNLocator
 import matplotlib.patches as patches
 import random
 import os
 import sys
+import time
+from matplotlib.colors import to_hex
 
 from data_import import import_data
+from delta_time import DeltaCache
+from crosshair import BlittedCrosshair
+from figure_registry import FigureRegistry
+from lap_table import format_lap_time, segment_laps
+from math_channels import MathChannel
+from signal_processing import damper_position_channels, damper_speed_name
+from live_stream import DEFAULT_PORT, LivePlotter, UdpSource
+from replay import REPLAY_SPEEDS, ReplaySource, dataset_columns
+from plot_model import PlotModel, Trace
+from resampling import ResamplingService
+from decimation import plot_decimated, redecimate_axes, set_line_source, watch_axes
 from plotting import plot_3d_data, plot_data, add_plot, erase_plot, reset_plots, plot_track_report, plot_scatter_data, plot_histogram_data
 
 class OpenRacePlot:
@@ -32,21 +46,34 @@ class OpenRacePlot:
             print("Icon file not found, proceeding without an icon.")
         
         self.dataframes = []
+        self.channel_stores = []  # One ChannelStore per dataset, parallel to self.dataframes
+        self.lap_tables = []  # One LapTable per dataset, parallel to self.dataframes
+        self.selected_laps = {}  # Dataset name -> lap drawn by newly dropped channels (None: whole session)
+        self.start_finish_line = None  # (lon1, lat1, lon2, lat2) used to split GPS logs into laps
+        self.last_selected_lap = None  # (dataset name, lap) most recently selected in the file explorer
+        self.reference_lap = None  # (dataset name, lap) that delta times are measured against, None: the best lap
+        self.resampler = ResamplingService()  # Channels on the shared distance/time grids, per (dataset, channel, grid)
+        self.common_grid = tk.BooleanVar(value=False)  # Overlay channels on the shared grid instead of their own samples
+        self.delta_cache = DeltaCache(self.resampler)  # Delta time results per (lap, reference) pair
+        self.math_channels = {}  # Math channel name -> expression, added to every dataset that has its inputs
         self.dataset_names = []
         self.dataset_colors = []
         self.channel_names = []
         self.num_plots = 1  # Start with one plot area
         self.is_3d_mode = False
 
-        self.crosshair_lines = []
+        self.figures = FigureRegistry()  # Owns every figure, canvas and toolbar
+        self.live_plotter = None  # Draws the live telemetry stream while one is running
+        self.fig = None
+        self.crosshair = None
         self.auto_selected_distance_channel = {}
         self.auto_selected_time_channel = {}
-        self.saved_plot_data = []
         self.distance_channels = []
         self.auto_selected_x_channel = {}
         self.channel_to_dataset_map = {}
 
         self.zoom_pan_callbacks = {}
+        self.plot_model = PlotModel(self.num_plots)  # Plot areas -> traces, the source of truth for the figure
         self.plot_areas = []  # <-- Initialize plot_areas here
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.create_menu()
@@ -58,9 +85,6 @@ class OpenRacePlot:
         # Now apply the black theme after plot_frame is created
         self.set_black_theme()
 
-        # Bind the crosshair event listener on startup
-        self.root.bind("<Motion>", self.synchronize_crosshair)
-
         # Ensure the main window resizes properly
         self.root.rowconfigure(0, weight=1)
         self.root.columnconfigure(0, weight=1)
@@ -81,29 +105,6 @@ class OpenRacePlot:
         
         return os.path.join(base_path, relative_path)
 
-    def synchronize_crosshair(self, event):
-        """Synchronize crosshair line across all plots and track its position."""
-        try:
-            if hasattr(event, 'inaxes') and event.inaxes:
-                x_position = event.xdata  # Get the mouse's X position in data coordinates
-
-                # Loop over all subplots and synchronize the crosshair line
-                for idx, ax in enumerate(self.axes):
-                    if x_position is not None:
-                        # If no crosshair exists for this subplot, create it
-                        if len(self.crosshair_lines[idx]) == 0:
-                            crosshair_line = ax.axvline(x=x_position, color='yellow', linestyle='--')
-                            self.crosshair_lines[idx].append(crosshair_line)
-                        else:
-                            # Update the existing crosshair line
-                            self.crosshair_lines[idx][0].set_xdata([x_position])
-
-                # Redraw the canvas to reflect the updated crosshair positions
-                self.canvas.draw()
-
-        except Exception as e:
-            print(f"Error synchronizing crosshair: {e}")
-
     def apply_alt_theme(self):
         style = ttk.Style(self.root)
         style.theme_use('clam')
@@ -119,6 +120,7 @@ class OpenRacePlot:
 
         file_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
         file_menu.add_command(label="Import Data", command=lambda: import_data(self))
+        file_menu.add_command(label="Import Data (Lazy)", command=lambda: import_data(self, lazy=True))
         file_menu.add_command(label="Exit", command=self.root.quit)
         menu_bar.add_cascade(label="File", menu=file_menu)
 
@@ -127,8 +129,32 @@ class OpenRacePlot:
         plot_menu.add_command(label="Scatter Plot", command=lambda: plot_scatter_data(self))
         plot_menu.add_command(label="Histogram Plot", command=lambda: plot_histogram_data(self))
         plot_menu.add_command(label="Track Report", command=lambda: plot_track_report(self))
+        plot_menu.add_separator()
+        plot_menu.add_checkbutton(label="Overlay on Common Grid", variable=self.common_grid, command=self.switch_x_channel)
+        plot_menu.add_command(label="Common Grid Step...", command=self.set_grid_step)
         menu_bar.add_cascade(label="Plots", menu=plot_menu)
 
+        lap_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
+        lap_menu.add_command(label="Set Start/Finish Line...", command=self.set_start_finish_line)
+        lap_menu.add_command(label="Plot Whole Sessions", command=self.clear_lap_selection)
+        lap_menu.add_separator()
+        lap_menu.add_command(label="Use Selected Lap as Reference", command=self.set_reference_lap)
+        lap_menu.add_command(label="Plot Delta Time", command=self.plot_delta_time)
+        menu_bar.add_cascade(label="Laps", menu=lap_menu)
+
+        math_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
+        math_menu.add_command(label="New/Edit Math Channel...", command=self.define_math_channel)
+        math_menu.add_command(label="Remove Math Channel...", command=self.remove_math_channel)
+        math_menu.add_separator()
+        math_menu.add_command(label="Add Damper Speeds", command=self.add_damper_speeds)
+        menu_bar.add_cascade(label="Math", menu=math_menu)
+
+        live_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
+        live_menu.add_command(label="Start Live Stream...", command=self.start_live_stream)
+        live_menu.add_command(label="Replay Dataset...", command=self.start_replay)
+        live_menu.add_command(label="Stop Live Stream", command=self.stop_live_stream)
+        menu_bar.add_cascade(label="Live", menu=live_menu)
+
         interface_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
         interface_menu.add_command(label="Black Theme", command=self.set_black_theme)
         interface_menu.add_command(label="White Theme", command=self.set_white_theme)
@@ -136,12 +162,16 @@ class OpenRacePlot:
 
         help_menu = Menu(menu_bar, tearoff=0, bg='#333333', fg='#ffffff')
         help_menu.add_command(label="Instructions", command=self.show_instructions)
+        help_menu.add_command(label="Figure Statistics", command=self.show_figure_stats)
         help_menu.add_command(label="About")
         menu_bar.add_cascade(label="Help", menu=help_menu)
 
     def on_closing(self):
         """Handle the closing event to ensure the application shuts down properly."""
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            if self.live_plotter is not None:
+                self.live_plotter.stop()
+            self.figures.release_all()  # Close every figure before the widgets go away
             self.root.quit()  # Stop the main loop
             self.root.destroy()  # Destroy the Tkinter window
 
@@ -161,7 +191,7 @@ class OpenRacePlot:
             for label in ax.get_xticklabels() + ax.get_yticklabels():
                 label.set_color('white')
         
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
     def set_white_theme(self):
         """Switch to white theme and set the current theme to white."""
@@ -179,7 +209,7 @@ class OpenRacePlot:
             for label in ax.get_xticklabels() + ax.get_yticklabels():
                 label.set_color('black')
         
-        self.canvas.draw()
+        self.canvas.draw_idle()
 
         
     def open_3d_plot_data_window(self):
@@ -320,6 +350,10 @@ class OpenRacePlot:
         self.file_list_label = tk.Label(file_explorer_frame, text="DATA", anchor="w", bg='#333333', fg='#ffffff')
         self.file_list_label.pack(side=tk.TOP, fill=tk.X)
 
+        # Progress of background imports, empty while nothing is being imported
+        self.import_progress = tk.Label(file_explorer_frame, text="", anchor="w", bg='#333333', fg='#aaaaaa')
+        self.import_progress.pack(side=tk.BOTTOM, fill=tk.X)
+
         # Create the listbox to display datasets and channels
         self.file_list = tk.Listbox(file_explorer_frame, bg='#333333', fg='#ffffff', selectbackground='#555555', selectforeground='#ffffff')
         self.file_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -338,6 +372,9 @@ class OpenRacePlot:
 
     def create_plot_area(self):
         """Create or recreate the plot area with subplots based on the number of plot areas."""
+        # Close the previous figure and destroy its canvas and toolbar
+        self.figures.release('main')
+
         # Clear the right_frame where the figure is displayed
         for widget in self.right_frame.winfo_children():
             widget.destroy()
@@ -346,18 +383,10 @@ class OpenRacePlot:
         self.plot_frame = tk.Frame(self.right_frame, bg='#333333')
         self.plot_frame.grid(row=0, column=0, sticky="nsew")
 
-        # Create a new figure and subplots, setting the figure size and layout
-        self.fig, self.axes = plt.subplots(self.num_plots, 1, figsize=(16, 4 * self.num_plots))
-
-        # Adjust layout between plots
-        if self.num_plots > 1:
-            self.fig.subplots_adjust(hspace=0)  # Remove vertical space between plots
-        else:
-            self.fig.subplots_adjust(hspace=0.3)
-
-        # Ensure that even a single subplot is treated as a list
-        if self.num_plots == 1:
-            self.axes = [self.axes]
+        # Create a new figure with one stacked subplot per plot area
+        self.fig = self.figures.new_figure('main', figsize=(16, 4 * self.num_plots))
+        grid = self.plot_grid(self.num_plots)
+        self.axes = [self.fig.add_subplot(grid[i]) for i in range(self.num_plots)]
 
         # Create a canvas for the figure and pack it into the plot_frame
         self.canvas = FigureCanvasTkAgg(self.fig, self.plot_frame)
@@ -370,6 +399,7 @@ class OpenRacePlot:
         # Create and pack the toolbar inside the toolbar frame
         self.toolbar = NavigationToolbar2Tk(self.canvas, self.toolbar_frame)
         self.toolbar.update()
+        self.figures.attach('main', self.canvas, self.toolbar)
 
         # Ensure the plot_frame resizes with the window, but toolbar remains in place
         self.plot_frame.grid_rowconfigure(0, weight=1)  # Make sure the plot resizes vertically
@@ -383,29 +413,56 @@ class OpenRacePlot:
         self.right_frame.pack_propagate(False)
         self.plot_frame.grid_propagate(False)
 
-        # Initialize crosshair lines for synchronization across all subplots
-        self.crosshair_lines = [[] for _ in self.axes]
+        # Attach a blitted crosshair to the new canvas (connected exactly once per canvas)
+        if self.crosshair is not None:
+            self.crosshair.disconnect()
+        self.crosshair = BlittedCrosshair(self.canvas, self.axes)
 
         # Configure the plot area and the canvas
         for ax in self.axes:
-            ax.grid(True, which='major', axis='y', linestyle='--', color='gray', alpha=0.2)
-
-            ax.xaxis.label.set_color('white' if self.set_black_theme else 'black')
-            ax.yaxis.label.set_color('white' if self.set_black_theme else 'black')
-            ax.tick_params(colors='white' if self.set_black_theme else 'black')
-            ax.set_facecolor('black' if self.set_black_theme else 'white')
+            self.configure_axes(ax)
 
-        # Bind the events for crosshair, zoom, and pan functionality
+        # Bind the events for zoom and pan functionality
         self.canvas.mpl_connect("scroll_event", self.zoom_function)
         self.canvas.mpl_connect("button_press_event", self.on_mouse_press)
         self.canvas.mpl_connect("motion_notify_event", self.on_mouse_move)
         self.canvas.mpl_connect("button_release_event", self.on_mouse_release)
-        self.canvas.mpl_connect("motion_notify_event", self.synchronize_crosshair)
+        self.canvas.mpl_connect("resize_event", self.on_canvas_resize)
         self.canvas.draw()
 
         # Track the plot areas as in the old code
         self.plot_areas = [(self.fig, ax, self.canvas, self.toolbar) for ax in self.axes]
 
+    def plot_grid(self, num_plots):
+        """Return the GridSpec that stacks num_plots plot areas on the figure."""
+        # Remove vertical space between plots when there is more than one
+        return GridSpec(num_plots, 1, figure=self.fig, hspace=0 if num_plots > 1 else 0.3)
+
+    def configure_axes(self, ax):
+        """Apply the grid, colors and re-decimation hook to a plot area."""
+        watch_axes(ax)  # Re-decimate lines whenever the visible X range changes
+        ax.grid(True, which='major', axis='y', linestyle='--', color='gray', alpha=0.2)
+
+        ax.xaxis.label.set_color('white' if self.set_black_theme else 'black')
+        ax.yaxis.label.set_color('white' if self.set_black_theme else 'black')
+        ax.tick_params(colors='white' if self.set_black_theme else 'black')
+        ax.set_facecolor('black' if self.set_black_theme else 'white')
+
+    def relayout_plot_areas(self):
+        """Move the existing axes onto a GridSpec for the current number of plot areas."""
+        grid = self.plot_grid(len(self.axes))
+        for i, ax in enumerate(self.axes):
+            ax.set_subplotspec(grid[i])
+
+        # Lines, canvas and toolbar are kept; only the crosshair and bookkeeping follow the axes
+        self.crosshair.set_axes(self.axes)
+        self.plot_areas = [(self.fig, ax, self.canvas, self.toolbar) for ax in self.axes]
+
+    def on_canvas_resize(self, event):
+        """Re-decimate all lines for the new pixel width of the plot areas."""
+        for ax in self.axes:
+            redecimate_axes(ax)
+
     def on_mouse_press(self, event):
         """Handle mouse press events for panning and right-click context menu."""
         if event.button == 2:  # Middle mouse button (scroll wheel button)
@@ -530,11 +587,23 @@ class OpenRacePlot:
         new_width = simpledialog.askfloat("Change Line Width", "Enter new line width:", minvalue=0.1, maxvalue=10.0)
         if new_width is not None:
             line.set_linewidth(new_width)
+
+            # Keep the style in the plot model so the trace is redrawn with it
+            _, trace = self.plot_model.find_trace(line)
+            if trace is not None:
+                trace.linewidth = new_width
+
             self.canvas.draw()  # Redraw the canvas to apply the changes
 
     def remove_line(self, line, ax):
         """Remove the selected line from the plot and update the legend."""
         line.remove()  # Remove the line from the axes
+
+        # Remove the trace from the plot model as well
+        _, trace = self.plot_model.find_trace(line)
+        if trace is not None:
+            self.plot_model.remove_trace(trace)
+
         ax.relim()  # Recompute the limits of the plot
         ax.autoscale()  # Rescale the plot to fit the remaining data
 
@@ -565,11 +634,6 @@ class OpenRacePlot:
             # Reset the time button to the default style
             self.time_button.config(style='TButton')
 
-            # Save the current plot data before switching modes
-            print("Saving plot data before switching to distance mode.")
-            self.save_plot_data()  # Ensure data is saved
-
-
             # Change the x-channel selection logic to use the distance channel
             for dataset_name in self.dataset_names:
                 if dataset_name in self.auto_selected_distance_channel:
@@ -577,14 +641,8 @@ class OpenRacePlot:
 
             print("Switching to distance mode. Re-plotting with distance as the X-axis.")
 
-            # Reset the plot area and re-plot with the updated X channel
-            self.reset_plots()  # Clear the existing plots
-            self.restore_plot_data()  # Restore and re-plot with the updated X-channel (distance)
-
-            if self.current_theme == 'black':
-                self.set_black_theme()
-            else:
-                self.set_white_theme()
+            # Swap the X data of the existing lines in place instead of rebuilding the figure
+            self.switch_x_channel()
 
         except Exception as e:
             print(f"Error activating distance mode: {e}")
@@ -602,12 +660,6 @@ class OpenRacePlot:
             # Reset the distance button to the default style
             self.distance_button.config(style='TButton')
 
-            # Save the current plot data before switching modes
-            print("Saving plot data before switching to time mode.")
-            self.save_plot_data()  # Ensure data is saved
-
-
-
             # Change the x-channel selection logic to use the time channel
             for dataset_name in self.dataset_names:
                 if dataset_name in self.auto_selected_time_channel:
@@ -615,89 +667,148 @@ class OpenRacePlot:
 
             print("Switching to time mode. Re-plotting with time as the X-axis.")
 
-            # Reset the plot area and re-plot with the updated X channel
-            self.reset_plots()  # Clear the existing plots
-            self.restore_plot_data()  # Restore and re-plot with the updated X-channel (time)
-
-            if self.current_theme == 'black':
-                self.set_black_theme()
-            else:
-                self.set_white_theme()
+            # Swap the X data of the existing lines in place instead of rebuilding the figure
+            self.switch_x_channel()
 
         except Exception as e:
             print(f"Error activating time mode: {e}")
 
 
 
-    def replot_with_selected_x_channel(self):
-        """Re-plot all data with the selected X channel after switching between distance and time."""
-        try:
-            for i, ax in enumerate(self.axes):
-                ax.clear()  # Clear the axis to reset the plot
+    def trace_data(self, trace):
+        """Return (x_channel, x_data, y_data, pyramid) of a trace for its current X channel, or None."""
+        if trace.reference is not None:
+            return self.delta_data(trace)
 
-                if i < len(self.saved_plot_data):
-                    for plot_data in self.saved_plot_data[i]:
-                        # Retrieve saved data
-                        y_channel, dataset_name, color = plot_data
+        store = self.channel_stores[self.dataset_names.index(trace.dataset_name)]
+        x_channel = trace.x_channel or self.auto_selected_x_channel.get(trace.dataset_name)
 
-                        # Select the appropriate X channel (time or distance)
-                        x_channel = self.auto_selected_x_channel.get(dataset_name)
-
-                        print(f"Re-plotting with X: {x_channel} and Y: {y_channel} for {dataset_name}")
-
-                        # Find the corresponding dataset
-                        dataset_index = self.dataset_names.index(dataset_name)
-                        df = self.dataframes[dataset_index]
-
-                        # Ensure both X and Y columns exist in the dataset
-                        if x_channel in df.columns and y_channel in df.columns:
-                            x_data = pd.to_numeric(df[x_channel], errors="coerce").dropna()
-                            y_data = pd.to_numeric(df[y_channel], errors="coerce").dropna()
-
-                            # Check if X and Y data have matching lengths
-                            if len(x_data) == len(y_data):
-                                ax.plot(x_data, y_data, label=f"{y_channel} vs {x_channel}", color=color)
+        if not x_channel or x_channel not in store or trace.channel not in store:
+            print(f"Missing X or Y channel for {trace.dataset_name}: X channel: {x_channel}, Y channel: {trace.channel}")
+            return None
 
-                                # Update title and x-axis label
-                                ax.set_title(f"{y_channel} vs {x_channel}")
-                                ax.set_xlabel(x_channel)
-                            else:
-                                print(f"Skipping due to mismatched lengths: X ({len(x_data)}) and Y ({len(y_data)})")
-                        else:
-                            print(f"Missing X or Y data for {dataset_name}: X channel: {x_channel}, Y channel: {y_channel}")
+        if self.common_grid.get() and trace.x_channel is None:
+            return self.grid_data(trace, store, x_channel)
 
-                    # Restore legend for the plot
-                    ax.legend()
+        if trace.lap is not None:
+            return x_channel, *self.lap_data(trace, store, x_channel), None
 
-            # Redraw the canvas to update all subplots
-            self.canvas.draw()
+        # The store already holds both arrays, nothing is parsed again
+        x_data = store.numeric(x_channel)
+        y_data = store.numeric(trace.channel)
+        if len(x_data) != len(y_data):
+            print(f"Skipping plot due to mismatched X ({len(x_data)}) and Y ({len(y_data)}) dimensions for {trace.channel} vs {x_channel}.")
+            return None
 
-        except Exception as e:
-            print(f"Error re-plotting with new X-axis: {e}")
+        return x_channel, x_data, y_data, store.pyramid(trace.channel)
+
+    def lap_data(self, trace, store, x_channel):
+        """Return the (x, y) samples of a trace's lap, sliced from the full channel arrays."""
+        lap_slice = self.lap_tables[self.dataset_names.index(trace.dataset_name)].lap_slice(trace.lap)
+        x_values, x_valid = store.coerce(x_channel)
+        y_values, y_valid = store.coerce(trace.channel)
+        x_data, y_data = x_values[lap_slice], y_values[lap_slice]  # Views, nothing is copied
+
+        valid = x_valid[lap_slice] & y_valid[lap_slice]
+        if not valid.all():
+            x_data, y_data = x_data[valid], y_data[valid]
+        if trace.x_channel is None and len(x_data):
+            # Start every lap at zero distance/time so laps overlay each other
+            x_data = x_data - x_data[0]
+        return x_data, y_data
+
+    def grid_kind(self, dataset_name, x_channel):
+        """Return the kind of common grid ('distance' or 'time') an X channel of a dataset is resampled on."""
+        return 'distance' if x_channel == self.auto_selected_distance_channel.get(dataset_name) else 'time'
+
+    def grid_data(self, trace, store, x_channel):
+        """Return a trace resampled on the common grid; every overlaid line shares the grid's X array."""
+        kind = self.grid_kind(trace.dataset_name, x_channel)
+        segment = None
+        if trace.lap is not None:
+            segment = self.lap_tables[self.dataset_names.index(trace.dataset_name)].segment(trace.lap)
+        x_data, y_data = self.resampler.resample(trace.dataset_name, store, trace.channel, x_channel, kind, segment=segment)
+        return f"{x_channel} (every {self.resampler.steps[kind]:g})", x_data, y_data, None
+
+    def set_grid_step(self):
+        """Ask for the spacing of the common distance and time grids and redraw the overlays on it."""
+        steps = {}
+        for kind, unit in (('distance', "distance channel units"), ('time', "seconds")):
+            step = simpledialog.askfloat("Common Grid Step", f"Spacing of the {kind} grid ({unit}):",
+                                         initialvalue=self.resampler.steps[kind], minvalue=1e-6, parent=self.root)
+            if step is None:
+                return
+            steps[kind] = step
+        self.resampler.steps.update(steps)
+        print(f"Common grid: every {steps['distance']:g} distance units, every {steps['time']:g} s")
+        # Delta times are always on the distance grid; other traces only when overlaying on it
+        self.switch_x_channel()
+
+    def delta_data(self, trace):
+        """Return the delta time of a trace's lap against its reference lap over the lap distance."""
+        reference_name, reference_lap = trace.reference
+        result = self.delta_cache.delta(self, self.dataset_names.index(trace.dataset_name), trace.lap,
+                                        self.dataset_names.index(reference_name), reference_lap)
+        x_channel = f"{self.auto_selected_distance_channel.get(trace.dataset_name)} from lap start"
+        return x_channel, result.grid, result.delta, None
+
+    def trace_label(self, trace, x_channel):
+        """Return the legend label of a trace."""
+        if trace.reference is not None:
+            reference_name, reference_lap = trace.reference
+            lap_label = self.lap_tables[self.dataset_names.index(trace.dataset_name)].label(trace.lap)
+            reference_label = self.lap_tables[self.dataset_names.index(reference_name)].label(reference_lap)
+            result = self.delta_cache.delta(self, self.dataset_names.index(trace.dataset_name), trace.lap,
+                                            self.dataset_names.index(reference_name), reference_lap)
+            # The final delta is the balance of the cumulative gain and loss along the lap
+            return (f"{trace.dataset_name} {lap_label} vs {reference_name} {reference_label}: {result.final_delta:+.3f} s "
+                    f"(gained {result.total_gained:.3f} s, lost {result.total_lost:.3f} s)")
+        label = f"{trace.dataset_name}: {trace.channel} vs {x_channel}"
+        if trace.lap is not None:
+            label += f" ({self.lap_tables[self.dataset_names.index(trace.dataset_name)].label(trace.lap)})"
+        return label
+
+    def draw_trace(self, ax, trace):
+        """Draw a trace of the plot model on ax and return its line (None if it cannot be drawn)."""
+        data = self.trace_data(trace)
+        if data is None:
+            return None
+        x_channel, x_data, y_data, pyramid = data
+
+        trace.line = plot_decimated(ax, x_data, y_data, pyramid=pyramid, label=self.trace_label(trace, x_channel),
+                                    color=trace.color, linewidth=trace.linewidth)
+
+        # Set plot title and axis labels
+        ax.set_title(f"{trace.channel} vs {x_channel}")
+        ax.set_xlabel(f"{x_channel} (X-axis)")
+        ax.set_ylabel(f"{trace.channel} (Y-axis)")
+        return trace.line
+
+    def switch_x_channel(self):
+        """Point every trace at the currently selected X channel of its dataset, updating its line in place."""
+        for area_index, trace in self.plot_model.traces():
+            ax = self.axes[area_index]
+            if trace.x_channel or trace.line is None or trace.line not in ax.lines:
+                continue  # Traces with an explicitly chosen X channel keep it
+
+            data = self.trace_data(trace)
+            if data is None:
+                continue
+            x_channel, x_data, y_data, pyramid = data
+
+            set_line_source(trace.line, x_data, y_data, pyramid)
+            trace.line.set_label(self.trace_label(trace, x_channel))
+            ax.set_title(f"{trace.channel} vs {x_channel}")
+            ax.set_xlabel(f"{x_channel} (X-axis)")
 
-    def update_plots_x_channel(self, mode):
-        """Update the X-axis of all plots based on the mode (Distance/Time)."""
-        for i, ax in enumerate(self.axes):
-            if i < len(self.saved_plot_data):
-                for plot_data in self.saved_plot_data[i]:
-                    x_data, y_data, label, color = plot_data
-
-                    # Switch the X-channel based on the current mode
-                    if mode == 'Distance':
-                        x_channel = self.auto_selected_x_channel.get(self.dataset_names[i], None)
-                    else:
-                        x_channel = self.auto_selected_time_channel.get(self.dataset_names[i], None)
-
-                    # Update the plot data with the selected X-channel
-                    if x_channel in self.dataframes[i].columns:
-                        ax.clear()  # Clear the old plot
-                        ax.plot(self.dataframes[i][x_channel], y_data, label=label, color=color)
-
-                    # Update X-axis labels and redraw
-                    ax.set_xlabel(f"{x_channel} (X-axis)")
-                    ax.legend()
+        for ax in self.axes:
+            if ax.get_lines():
+                # Fit the new X range and refresh the legend labels
+                ax.relim()
+                ax.autoscale_view()
+                ax.legend()
 
-        self.canvas.draw()  # Redraw the canvas
+        self.canvas.draw_idle()
 
     def fit_plots_to_area(self):
         """Set the x-limits of all plot areas based on the limits of the first plot area."""
@@ -726,7 +837,7 @@ class OpenRacePlot:
         print(f"Start dragging channel: {selected_channel}")
 
         # Check if it's a valid channel (skip dataset names or channel headers)
-        if selected_channel.startswith("▶") or selected_channel.startswith("▼") or selected_channel.startswith("⬜"):
+        if selected_channel.startswith(("▶", "▼", "⬜", "⏱")):
             self.drag_data = None  # Invalid drag item
             print("Invalid item selected for dragging.")
         else:
@@ -854,8 +965,8 @@ class OpenRacePlot:
             # Find the dataset index using the dataset name
             dataset_index = next(i for i, d in enumerate(self.dataset_names) if dataset_name in d)
 
-            # Get the dataframe for this dataset
-            df = self.dataframes[dataset_index]
+            # Get the numeric channel store for this dataset
+            store = self.channel_stores[dataset_index]
 
             # Check if the auto-selected X channel (distance) is available for this dataset
             x_col = self.auto_selected_x_channel.get(self.dataset_names[dataset_index], None)
@@ -870,35 +981,24 @@ class OpenRacePlot:
             # Ensure the selected X and Y columns exist in the dataframe without the index suffix
             base_channel_name = unique_channel_name.split('##')[0]  # Remove the index suffix
 
-            if x_col not in df.columns:
+            if x_col not in store:
                 raise ValueError(f"X channel '{x_col}' not found in dataset.")
 
-            if base_channel_name not in df.columns:
+            if base_channel_name not in store:
                 raise ValueError(f"Y channel '{base_channel_name}' not found in dataset.")
 
-            # Extract the selected data
-            x_data = pd.to_numeric(df[x_col], errors='coerce').dropna()
-            y_data = pd.to_numeric(df[base_channel_name], errors='coerce').dropna()
-
-            # Ensure x_data and y_data have matching dimensions
-            if len(x_data) != len(y_data):
-                print(f"Skipping plot due to mismatched x ({len(x_data)}) and y ({len(y_data)}) dimensions.")
-                return  # Skip plotting if dimensions don't match
-            
             if self.current_theme == 'black':
                 self.set_black_theme()
             else:
                 self.set_white_theme()
 
-            # Plot the data on the selected plot area
-            ax.plot(x_data, y_data, label=f"{dataset_name}: {base_channel_name} vs {x_col}", color=self.dataset_colors[dataset_index % len(self.dataset_colors)])
-
-            # Set plot title
-            ax.set_title(f"{base_channel_name} vs {x_col}")
-
-            # Set X and Y axis labels
-            ax.set_xlabel(f"{x_col} (X-axis)")
-            ax.set_ylabel(f"{base_channel_name} (Y-axis)")
+            # Add the trace to the plot model and draw it on the selected plot area
+            trace = Trace(self.dataset_names[dataset_index], base_channel_name, self.dataset_colors[dataset_index % len(self.dataset_colors)],
+                          x_channel=None if x_col == self.auto_selected_x_channel.get(self.dataset_names[dataset_index]) else x_col,
+                          lap=self.selected_laps.get(self.dataset_names[dataset_index]))
+            if self.draw_trace(ax, trace) is None:
+                return  # Skip plotting if the channels cannot be plotted against each other
+            self.plot_model.add_trace(self.axes.index(ax), trace)
 
             # Enable legend if there are labeled artists
             if ax.get_legend_handles_labels()[0]:  # Check if there are any labels to display
@@ -947,13 +1047,17 @@ class OpenRacePlot:
 
     def add_plot(self):
         """Increase the number of subplots dynamically and retain previous data while fitting all plots."""
-        self.save_plot_data()  # Save the current plot data
-        
+        self.plot_model.add_area()  # Add an empty plot area to the model
+
         self.num_plots += 1  # Increase the number of subplots
-        
-        self.create_plot_area()  # Recreate plot area with the new number of subplots
-        
-        self.restore_plot_data()  # Restore previous data into the subplots
+
+        # Add one axes to the existing figure and restack all plot areas; existing lines are kept
+        ax = self.fig.add_subplot(self.plot_grid(self.num_plots)[self.num_plots - 1])
+        self.axes.append(ax)
+        self.configure_axes(ax)
+        self.relayout_plot_areas()
+
+        self.render_plot_model()  # Draw any model traces that are not on the axes yet
 
         # Apply the current theme
         if self.current_theme == 'black':
@@ -972,9 +1076,6 @@ class OpenRacePlot:
         # After adding the new plot, refit all data in the existing plot areas
         self.refit_all_plots()  # Refit the data into the plot areas
 
-        # Ensure the crosshair is initialized and synchronized across all plots
-        self.canvas.mpl_connect("motion_notify_event", self.synchronize_crosshair)
-
     def refit_all_plots(self):
         """Refit all the data in each plot area after adding or modifying a plot."""
         try:
@@ -989,120 +1090,64 @@ class OpenRacePlot:
                     ax.set_xlim([all_x_data.min(), all_x_data.max()])
                     ax.set_ylim([all_y_data.min(), all_y_data.max()])
 
-                if self.current_theme == 'black':
-                    self.set_black_theme()
-                else:
-                    self.set_white_theme()
+            if self.current_theme == 'black':
+                self.set_black_theme()
+            else:
+                self.set_white_theme()
             
             # Redraw the canvas after adjusting the limits
-            self.canvas.draw()
+            self.canvas.draw_idle()
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while refitting plots: {str(e)}")
 
-    def save_plot_data(self):
-        """Save the current data of all plot areas, ensuring we store only the Y-channel and metadata for later restoration."""
-        self.saved_plot_data = []
-        for ax in self.axes:  # Loop over all subplots
-            plot_data = []
-            for line in ax.get_lines():
-                y_data = line.get_ydata()  # Save only Y-data
-                label = line.get_label()
-                color = line.get_color()
-
-                # Extract the dataset name and Y-channel from the label (assuming the format: 'dataset: Y vs X')
-                if ':' in label:
-                    dataset_name, y_channel_info = label.split(':')
-                    y_channel = y_channel_info.split(' vs ')[0].strip()  # Extract Y-channel and strip any spaces
-                    plot_data.append((y_channel, dataset_name.strip(), color))  # Save Y-channel, dataset name, and color
-
-            # Save plot title, X-label, and Y-label for restoring later
-            title = ax.get_title()
-            x_label = ax.get_xlabel()
-            y_label = ax.get_ylabel()
-
-            # Append the plot data and metadata (title, labels) for restoration
-            self.saved_plot_data.append((plot_data, title, x_label, y_label))
-
-        # Print for debugging
-        print(f"Total plot areas saved: {len(self.saved_plot_data)}")
-        for i, (plot_data, title, x_label, y_label) in enumerate(self.saved_plot_data):
-            print(f"Plot area {i+1} contains {len(plot_data)} plots.")
-            for y_channel, dataset_name, color in plot_data:
-                print(f"  - Saved Y-channel: {y_channel} from dataset {dataset_name}")
-            print(f"  - Title: {title}, X-label: {x_label}, Y-label: {y_label}")
-
-
-    def restore_plot_data(self):
-        """Re-plot the saved Y-channel data using the current X-channel (distance or time) and restore axis labels and titles."""
+    def render_plot_model(self):
+        """Bring the axes in line with the plot model: drop stray lines and draw traces that have no line yet."""
         try:
-            for i, ax in enumerate(self.axes):
-                if i < len(self.saved_plot_data):
-                    plot_data, title, _, y_label = self.saved_plot_data[i]  # Retrieve saved plot data and labels
-
-                    if not plot_data:
-                        continue  # Skip if no plot data is saved for this plot area
-
-                    for y_channel, dataset_name, color in plot_data:
-                        # Determine the correct X channel (Distance or Time) based on the current mode
-                        x_channel = self.auto_selected_x_channel.get(dataset_name, None)
-                        df = self.dataframes[self.dataset_names.index(dataset_name)]
-
-                        if x_channel and y_channel:
-                            print(f"Restoring plot with X channel: {x_channel} and Y channel: {y_channel} from dataset {dataset_name}")
-
-                            # Fetch the X and Y data from the dataset
-                            x_data = pd.to_numeric(df[x_channel], errors='coerce').dropna()
-                            y_data = pd.to_numeric(df[y_channel], errors='coerce').dropna()
-
-                            # Ensure that both X and Y data have the same length before plotting
-                            if len(x_data) == len(y_data):
-                                ax.plot(x_data, y_data, label=f"{dataset_name}: {y_channel} vs {x_channel}", color=color)
-
-                                # Update the title and x-axis label
-                                ax.set_title(f"{y_channel} vs {x_channel}")
-                                ax.set_xlabel(x_channel)
-                            else:
-                                print(f"Skipping plot due to mismatched X and Y dimensions for {y_channel} vs {x_channel}.")
-                        else:
-                            print(f"Error: Missing X channel or Y channel for {dataset_name}")
-
-                    # Restore the Y-label
-                    ax.set_ylabel(y_label)
-
-                    # Restore legend for the plot
+            for area_index, ax in enumerate(self.axes):
+                traces = self.plot_model.areas[area_index].traces if area_index < len(self.plot_model.areas) else []
+                model_lines = [trace.line for trace in traces]
+
+                # Remove lines that are not part of the model anymore
+                for line in ax.get_lines():
+                    if line not in model_lines:
+                        line.remove()
+
+                # Draw only the traces whose line is missing from this axes
+                for trace in traces:
+                    if trace.line is None or trace.line not in ax.lines:
+                        print(f"Drawing {trace.channel} from dataset {trace.dataset_name} in plot area {area_index + 1}")
+                        self.draw_trace(ax, trace)
+
+                if ax.get_lines():
                     ax.legend()
 
-            # Redraw the canvas after restoring all plots
-            self.canvas.draw()
+            # Schedule one redraw after updating the plots
+            self.canvas.draw_idle()
 
         except Exception as e:
-            print(f"Error while restoring and re-plotting data: {e}")
+            print(f"Error while rendering the plot model: {e}")
 
     def erase_plot(self):
         """Erase the last plot and resize the remaining plots, while retaining the data."""
         try:
             # Ensure there's more than one plot before attempting to erase
             if self.num_plots > 1:
-                # Save the current plot data
-                self.save_plot_data()
+                # Remove the last plot area (and its traces) from the model
+                self.plot_model.remove_area()
 
-                # Remove the last plot area and destroy its canvas
-                fig, ax, canvas, _ = self.plot_areas.pop()
-                canvas.get_tk_widget().destroy()
+                # Remove the last axes from the figure and restack the remaining ones in place
+                ax = self.axes.pop()
+                self.zoom_pan_callbacks.pop(ax, None)
+                self.fig.delaxes(ax)
 
                 # Reduce the number of plot areas
                 self.num_plots -= 1
-
-                # Recreate the plot area with the remaining plots
-                self.create_plot_area()
-
-                # Restore the saved data to the remaining plots
-                self.restore_plot_data()
+                self.relayout_plot_areas()
 
                 print(f"Plot erased, {self.num_plots} plots remaining.")
 
-                        # Apply the current theme
+                # Apply the current theme
                 if self.current_theme == 'black':
                     self.set_black_theme()
                 else:
@@ -1117,13 +1162,10 @@ class OpenRacePlot:
     def reset_plots(self):
         """Reset the plot areas by clearing the data but keeping the same number of subplots."""
         self.num_plots = len(self.plot_areas)  # Keep the same number of subplots
-        self.create_plot_area()  # Recreate the layout with empty subplots
-        self.crosshair_lines = [[] for _ in self.axes]  # Reinitialize the crosshair lines for all plot areas
-
-        # Reconnect the crosshair synchronization after reset
-        self.canvas.mpl_connect("motion_notify_event", self.synchronize_crosshair)
+        self.plot_model.clear()  # Drop every trace from the model
+        self.create_plot_area()  # Recreate the layout with empty subplots (and a fresh crosshair)
 
-        print("Plots have been reset, and crosshair functionality has been restored.")
+        print("Plots have been reset.")
         if self.current_theme == 'black':
             self.set_black_theme()
         else:
@@ -1139,10 +1181,15 @@ class OpenRacePlot:
             self.file_list.insert(tk.END, f"⬜ {dataset_name}")
             self.file_list.itemconfig(tk.END, {'fg': color})  # Set the color of the dataset
 
-            # Calculate lap time for the dataset
-            lap_time = self.calculate_lap_time(i)
-            self.file_list.insert(tk.END, f"  Lap Time: {lap_time:.2f} sec")  # Display lap time
-            
+            # List every lap with its time; the selected lap is highlighted
+            lap_table = self.lap_tables[i]
+            best_lap = lap_table.best_lap()
+            for lap in range(len(lap_table)):
+                best = "  ★" if lap == best_lap else ""
+                self.file_list.insert(tk.END, f"  ⏱ {lap_table.label(lap)}  {format_lap_time(lap_table.lap_times[lap])}{best}")
+                if self.selected_laps.get(dataset_name) == lap:
+                    self.file_list.itemconfig(tk.END, {'bg': '#555555'})
+
             # Add the toggleable channels
             self.file_list.insert(tk.END, f"▶ Channels")
 
@@ -1150,32 +1197,263 @@ class OpenRacePlot:
             for channel in self.channel_names[i]:
                 clean_channel = channel.split("##")[0]  # Strip the '##' part for display
                 self.file_list.insert(tk.END, f"  - {clean_channel}")
+                if clean_channel in self.channel_stores[i].math_channels:
+                    self.file_list.itemconfig(tk.END, {'fg': '#66ccff'})  # Math channels stand out from logged ones
                 self.channel_to_dataset_map[channel] = dataset_name  # Map channel to dataset
 
-    def calculate_lap_time(self, dataset_index):
-        """Calculate the lap time from the detected time channel for a given dataset."""
-        dataset_name = self.dataset_names[dataset_index]
-        time_channel = self.auto_selected_time_channel.get(dataset_name)
-
-        if time_channel:
-            df = self.dataframes[dataset_index]
-            time_data = pd.to_numeric(df[time_channel], errors='coerce').dropna()
-
-            # Calculate the lap time as the difference between the first and last time values
-            lap_time = time_data.iloc[-1] - time_data.iloc[0]
-            return lap_time
-        return 0.0
-
+    def dataset_line(self, index):
+        """Return the index of the dataset line that the file explorer line at index belongs to, or None."""
+        for i in range(index, -1, -1):
+            item_text = self.file_list.get(i)
+            if item_text.startswith("⬜") and item_text.lstrip("⬜").strip() in self.dataset_names:
+                return i
+        return None
+
+    def dataset_at(self, index):
+        """Return the name of the dataset that the file explorer line at index belongs to, or None."""
+        line = self.dataset_line(index)
+        return None if line is None else self.file_list.get(line).lstrip("⬜").strip()
+
+    def select_lap(self, dataset_name, lap):
+        """Make newly dropped channels of dataset_name draw only lap (clicking the selected lap again selects the whole session)."""
+        if self.selected_laps.get(dataset_name) == lap:
+            self.selected_laps.pop(dataset_name)
+            print(f"{dataset_name}: plotting the whole session")
+        else:
+            self.selected_laps[dataset_name] = lap
+            self.last_selected_lap = (dataset_name, lap)
+            lap_table = self.lap_tables[self.dataset_names.index(dataset_name)]
+            print(f"{dataset_name}: plotting {lap_table.label(lap)} ({format_lap_time(lap_table.lap_times[lap])})")
+        self.update_file_explorer()
+
+    def clear_lap_selection(self):
+        self.selected_laps.clear()
+        self.update_file_explorer()
+
+    def set_reference_lap(self):
+        """Measure delta times against the lap most recently selected in the file explorer."""
+        if self.last_selected_lap is None or self.selected_laps.get(self.last_selected_lap[0]) != self.last_selected_lap[1]:
+            messagebox.showinfo("Reference Lap", "Double-click a lap in the file explorer first.")
+            return
+        self.reference_lap = self.last_selected_lap
+        dataset_name, lap = self.reference_lap
+        print(f"Reference lap: {dataset_name} {self.lap_tables[self.dataset_names.index(dataset_name)].label(lap)}")
+
+    def best_reference_lap(self):
+        """Return (dataset name, lap) of the fastest full lap of all datasets that have distance and time, or None."""
+        best = None
+        for i, dataset_name in enumerate(self.dataset_names):
+            lap = self.lap_tables[i].best_lap()
+            if lap is None or not self.auto_selected_distance_channel.get(dataset_name):
+                continue
+            if best is None or self.lap_tables[i].lap_times[lap] < best[2]:
+                best = (dataset_name, lap, self.lap_tables[i].lap_times[lap])
+        return best[:2] if best else None
+
+    def plot_delta_time(self):
+        """Add a plot area with the delta time of every full lap against the reference lap."""
+        reference = self.reference_lap or self.best_reference_lap()
+        if reference is None:
+            messagebox.showerror("Error", "No full lap with distance and time channels to compare against.")
+            return
+
+        laps = [(dataset_name, lap) for i, dataset_name in enumerate(self.dataset_names)
+                if self.auto_selected_distance_channel.get(dataset_name) and self.auto_selected_time_channel.get(dataset_name)
+                for lap in np.flatnonzero(self.lap_tables[i].complete).tolist() if (dataset_name, lap) != reference]
+        if not laps:
+            messagebox.showinfo("Delta Time", "There are no other full laps to compare.")
+            return
+
+        started = time.perf_counter()
+        for dataset_name, lap in laps:
+            self.delta_cache.delta(self, self.dataset_names.index(dataset_name), lap,
+                                   self.dataset_names.index(reference[0]), reference[1])
+        print(f"Computed {len(laps)} delta times in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        self.add_plot()
+        area_index = len(self.axes) - 1
+        ax = self.axes[area_index]
+        colormap = plt.cm.viridis
+        for i, (dataset_name, lap) in enumerate(laps):
+            # One color per lap; the dataset colors cannot tell dozens of laps apart
+            trace = Trace(dataset_name, "Delta Time", to_hex(colormap(i / max(len(laps) - 1, 1))), lap=lap, reference=reference)
+            if self.draw_trace(ax, trace) is not None:
+                self.plot_model.add_trace(area_index, trace)
+        ax.set_ylabel("Delta Time (s)")
+        ax.legend()
+        self.refit_all_plots()
+
+    def set_start_finish_line(self):
+        """Ask for a start/finish line and split datasets with GPS channels into laps at its crossings."""
+        answer = simpledialog.askstring("Start/Finish Line", "Start/finish line as 'longitude1, latitude1, longitude2, latitude2':",
+                                        parent=self.root)
+        if not answer:
+            return
+        try:
+            line = tuple(float(value) for value in answer.split(','))
+            if len(line) != 4:
+                raise ValueError("Four numbers are needed")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid start/finish line: {str(e)}")
+            return
+
+        self.start_finish_line = line
+        self.selected_laps.clear()  # Lap numbers change with the new split
+        self.last_selected_lap = self.reference_lap = None
+        self.delta_cache.clear()
+        self.resampler.invalidate()  # Lap sample ranges changed
+        for i, dataset_name in enumerate(self.dataset_names):
+            self.lap_tables[i] = segment_laps(self.channel_stores[i], self.auto_selected_time_channel.get(dataset_name),
+                                              self.auto_selected_distance_channel.get(dataset_name), line)
+            print(f"{dataset_name}: {len(self.lap_tables[i])} laps by {self.lap_tables[i].method}")
+        self.update_file_explorer()
+
+    def define_math_channel(self):
+        """Ask for a math channel name and expression and add (or redefine) it in every dataset with its inputs."""
+        name = simpledialog.askstring("Math Channel", "Name of the math channel (an existing name edits it):", parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        expression = simpledialog.askstring(
+            "Math Channel", f"Expression of '{name}', e.g. derivative('Susp Pos FL') or 'Brake Pres Front' / "
+                            f"('Brake Pres Front' + 'Brake Pres Rear') * 100:",
+            initialvalue=self.math_channels.get(name, ""), parent=self.root)
+        if not expression:
+            return
+        try:
+            added = self.apply_math_channel(name, expression)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid math channel '{name}': {str(e)}")
+            return
+        if not added:
+            messagebox.showerror("Error", "Import a dataset first.")
+            return
+        self.math_channels[name] = expression
+        self.update_file_explorer()
+        print(f"Math channel '{name}' = {expression} added to {', '.join(added)}")
+
+    def apply_math_channel(self, name, expression, dataset_indices=None):
+        """Add a math channel to the datasets that have its inputs and return their names.
+
+        Lines already showing it (or a math channel computed from it) are updated in place.
+        Raises ValueError when no dataset accepts it or the new definition breaks a dataset that had it.
+        """
+        # Check (and evaluate) every dataset first, so a definition that breaks one of them changes none
+        math_channels = {}  # Dataset index -> (MathChannel, its values)
+        errors = []
+        for i in range(len(self.dataset_names)) if dataset_indices is None else dataset_indices:
+            store = self.channel_stores[i]
+            try:
+                # Parsed per dataset: derivative() and integral() read the dataset's own time channel
+                math_channel = MathChannel(name, expression, self.auto_selected_time_channel.get(self.dataset_names[i]))
+                math_channels[i] = (math_channel, store.check_math_channel(math_channel))
+            except ValueError as e:
+                if name in store.math_channels:
+                    raise ValueError(f"{self.dataset_names[i]}: {str(e)}") from None
+                print(f"{self.dataset_names[i]}: math channel '{name}' skipped: {str(e)}")
+                math_channels.pop(i, None)
+                errors.append(str(e))
+        if errors and not math_channels:
+            raise ValueError(errors[0])  # A syntax error, or no dataset has the inputs
+
+        for i, (math_channel, values) in math_channels.items():
+            dataset_name = self.dataset_names[i]
+            changed = self.channel_stores[i].add_math_channel(math_channel, values)
+            if f"{name}##{i}" not in self.channel_names[i]:
+                self.channel_names[i].append(f"{name}##{i}")
+                self.channel_to_dataset_map[f"{name}##{i}"] = dataset_name
+            self.resampler.invalidate(dataset_name, changed)
+            self.refresh_traces(dataset_name, changed)
+        return [self.dataset_names[i] for i in math_channels]
+
+    def attach_math_channels(self, dataset_index):
+        """Add the defined math channels to a newly imported dataset (in definition order, so inputs come first)."""
+        for name, expression in self.math_channels.items():
+            try:
+                self.apply_math_channel(name, expression, [dataset_index])
+            except ValueError:
+                pass  # apply_math_channel already reported why the dataset was skipped
+
+    def add_damper_speeds(self):
+        """Derive a damper speed math channel (Savitzky-Golay derivative) from every damper position channel."""
+        positions = []
+        for store in self.channel_stores:
+            positions += [channel for channel in damper_position_channels(store.columns) if channel not in positions]
+        if not positions:
+            messagebox.showinfo("Damper Speeds", "No damper position channels found.")
+            return
+
+        for channel in positions:
+            name = damper_speed_name(channel)
+            expression = f"sg_derivative({channel!r})"
+            try:
+                self.apply_math_channel(name, expression)
+            except ValueError as e:
+                print(f"Damper speed of '{channel}' skipped: {str(e)}")
+                continue
+            self.math_channels[name] = expression
+            print(f"Math channel '{name}' = {expression}")
+        self.update_file_explorer()
+
+    def remove_math_channel(self):
+        """Ask for a math channel and remove it from every dataset."""
+        if not self.math_channels:
+            messagebox.showinfo("Math Channel", "There are no math channels.")
+            return
+        name = simpledialog.askstring("Math Channel", f"Math channel to remove ({', '.join(self.math_channels)}):", parent=self.root)
+        if not name or name.strip() not in self.math_channels:
+            return
+        name = name.strip()
+        if any(trace.channel == name or trace.x_channel == name for _, trace in self.plot_model.traces()):
+            messagebox.showerror("Error", f"'{name}' is plotted; remove its lines first.")
+            return
+        try:
+            for i, dataset_name in enumerate(self.dataset_names):
+                if name in self.channel_stores[i].math_channels:
+                    self.channel_stores[i].remove_math_channel(name)
+                    self.channel_names[i].remove(f"{name}##{i}")
+                    self.channel_to_dataset_map.pop(f"{name}##{i}", None)
+                    self.resampler.invalidate(dataset_name, {name})
+        except ValueError as e:
+            messagebox.showerror("Error", f"Cannot remove '{name}': {str(e)}")
+            return
+        del self.math_channels[name]
+        self.update_file_explorer()
+
+    def refresh_traces(self, dataset_name, channels):
+        """Update the lines of a dataset's traces that read one of channels, in place."""
+        refreshed = set()
+        for area_index, trace in self.plot_model.traces():
+            ax = self.axes[area_index]
+            if trace.dataset_name != dataset_name or trace.line is None or trace.line not in ax.lines:
+                continue
+            if trace.channel not in channels and trace.x_channel not in channels:
+                continue
+            try:
+                data = self.trace_data(trace)
+            except ValueError as e:
+                print(f"Cannot update {trace.channel} of {dataset_name}: {str(e)}")  # A math channel computed from a changed one
+                continue
+            if data is None:
+                continue
+            set_line_source(trace.line, *data[1:])
+            refreshed.add(ax)
+
+        for ax in refreshed:
+            ax.relim()
+            ax.autoscale_view()
+        if refreshed:
+            self.canvas.draw_idle()
 
     def plot_channel(self, dataset_index, channel_name):
         """Plot a given channel from a dataset."""
         try:
-            df = self.dataframes[dataset_index]
+            store = self.channel_stores[dataset_index]
             x_channel = self.auto_selected_x_channel.get(dataset_index, None)
 
-            if x_channel and x_channel in df.columns and channel_name in df.columns:
-                x_data = df[x_channel]
-                y_data = df[channel_name]
+            if x_channel and x_channel in store and channel_name in store:
+                x_data = store.numeric(x_channel)
+                y_data = store.numeric(channel_name)
 
                 # Plot on the selected plot area (e.g., last created plot area)
                 fig, ax, canvas, _ = self.plot_areas[-1]  # Plot on the last plot area
@@ -1199,8 +1477,13 @@ class OpenRacePlot:
         selected_index = self.file_list.curselection()[0]
         item_text = self.file_list.get(selected_index)
 
-        # Determine if it's a "Channels" line or a dataset line
-        if item_text.startswith("▶ Channels") or item_text.startswith("▼ Channels"):
+        # Determine if it's a lap line, a "Channels" line or a dataset line
+        if item_text.startswith("  ⏱"):
+            dataset_name = self.dataset_at(selected_index)
+            lap = selected_index - self.dataset_line(selected_index) - 1  # Lap lines follow the dataset line in order
+            self.select_lap(dataset_name, lap)
+
+        elif item_text.startswith("▶ Channels") or item_text.startswith("▼ Channels"):
             next_index = selected_index + 1
             if next_index < self.file_list.size() and self.file_list.get(next_index).startswith("  - "):
                 # Collapse channels if they are already expanded
@@ -1210,13 +1493,7 @@ class OpenRacePlot:
                 self.file_list.insert(selected_index, f"▶ Channels")
             else:
                 # Expand channels
-                dataset_name_index = selected_index - 1  # This is the line that should contain the dataset name
-
-                # Skip over any lines showing lap times, we only care about the dataset name
-                while "Lap Time:" in self.file_list.get(dataset_name_index):
-                    dataset_name_index -= 1  # Skip any lap time lines until we reach the dataset name
-
-                dataset_name = self.file_list.get(dataset_name_index).lstrip("⬜").strip()  # Clean symbols before dataset name
+                dataset_name = self.dataset_at(selected_index)  # Lap lines sit between the dataset name and this line
                 dataset_index = self.dataset_names.index(dataset_name)
 
                 channels = self.channel_names[dataset_index]
@@ -1232,7 +1509,7 @@ class OpenRacePlot:
 
         else:
             # Extract the dataset and channel names
-            dataset_name = self.file_list.get(selected_index - 2).lstrip("⬜").strip()  # Get dataset name two lines above
+            dataset_name = self.dataset_at(selected_index)
             channel_name = item_text.strip("  - ")  # Clean the channel name
 
             dataset_index = self.dataset_names.index(dataset_name)
@@ -1272,7 +1549,7 @@ class OpenRacePlot:
         
         1. Import Data:
         - Click 'Import' in the File menu or on the icon bar to load your dataset.
-        - Supported formats: CSV, Excel, TXT.
+        - Supported formats: CSV, Excel, TXT and MoTeC i2 logs (.ld).
         - Make sure channel and data locations are in the same row for successfull data importing
         
         2. Plot Data:
@@ -1307,6 +1584,88 @@ class OpenRacePlot:
         # Pack the text widget
         instructions_text.pack(fill=tk.BOTH, expand=True)
 
+    def start_live_stream(self):
+        """Listen for live telemetry on a UDP port and draw it in the plot areas."""
+        if self.live_plotter is not None:
+            messagebox.showinfo("Live Stream", "A live stream is already running.")
+            return
+
+        if not self.confirm_live_replaces_plots("Live Stream"):
+            return
+        port = simpledialog.askinteger("Live Stream", "UDP port:", initialvalue=DEFAULT_PORT, parent=self.root)
+        if not port:
+            return
+        bindings = self.ask_live_bindings("Live Stream")
+
+        try:
+            self.live_plotter = LivePlotter(self, UdpSource(port), bindings)
+            self.live_plotter.start()
+        except OSError as e:
+            self.live_plotter = None
+            messagebox.showerror("Error", f"Could not listen on UDP port {port}: {str(e)}")
+
+    def confirm_live_replaces_plots(self, title):
+        """Ask before a live stream clears the plotted traces; True when there are none."""
+        if not any(True for _ in self.plot_model.traces()):
+            return True
+        return messagebox.askyesno(title, "The live plots replace every plotted line. Continue?", parent=self.root)
+
+    def ask_live_bindings(self, title):
+        """Ask which channels to draw in which plot area; an empty list shows one channel per area."""
+        layout = simpledialog.askstring(title, "Channels per plot area, separated by ',' within an area and ';' between areas.\n"
+                                        "Leave empty to show one channel per plot area:", parent=self.root)
+        return [[channel.strip() for channel in area.split(',') if channel.strip()] for area in layout.split(';')] if layout else []
+
+    def start_replay(self):
+        """Replay an imported dataset through the live plots, paced by its time channel."""
+        if self.live_plotter is not None:
+            messagebox.showinfo("Replay", "A live stream is already running.")
+            return
+        if not self.dataset_names:
+            messagebox.showerror("Error", "Import a dataset to replay first.")
+            return
+
+        dataset_name = self.dataset_names[-1]
+        if len(self.dataset_names) > 1:
+            dataset_name = simpledialog.askstring("Replay", "Dataset to replay:\n" + "\n".join(self.dataset_names),
+                                                  initialvalue=dataset_name, parent=self.root)
+            if dataset_name not in self.dataset_names:
+                return
+        time_channel = self.auto_selected_time_channel.get(dataset_name)
+        if time_channel is None:
+            messagebox.showerror("Error", f"No time channel was detected in {dataset_name}.")
+            return
+
+        if not self.confirm_live_replaces_plots("Replay"):
+            return
+        speed = simpledialog.askstring("Replay", f"Speed ({', '.join(REPLAY_SPEEDS)}):", initialvalue='1x', parent=self.root)
+        if speed not in REPLAY_SPEEDS:
+            return
+        bindings = self.ask_live_bindings("Replay")
+
+        columns = dataset_columns(self.channel_stores[self.dataset_names.index(dataset_name)], time_channel,
+                                  bindings, len(self.axes))
+        if time_channel not in columns:
+            messagebox.showerror("Error", f"The time channel {time_channel} of {dataset_name} holds no numbers.")
+            return
+        source = ReplaySource(columns, time_channel, REPLAY_SPEEDS[speed])
+        self.live_plotter = LivePlotter(self, source, bindings)
+        self.live_plotter.start()
+
+    def stop_live_stream(self):
+        """Stop the live stream and keep its last frame on screen."""
+        if self.live_plotter is None:
+            return
+        self.live_plotter.stop()
+        messagebox.showinfo("Live Stream", f"Live stream stopped.\n{self.live_plotter.describe()}")
+        self.live_plotter = None
+
+    def show_figure_stats(self):
+        """Show how many figures and artists are currently alive."""
+        stats = self.figures.stats()
+        messagebox.showinfo("Figure Statistics", f"Live figures: {stats['figures']}\nLive artists: {stats['artists']}")
+        print(f"Figure statistics: {stats}")
+
     def random_color(self):
         colors = ["Red", "Blue", "Black", "Green"]
         return colors[len(self.dataset_colors) % len(colors)]